@@ -0,0 +1,153 @@
+"""
+ASGI entry point for the backend.
+
+Run with:  uvicorn asgi:application --host 0.0.0.0 --port 5021
+
+Long-poll requests (GET /api/v2/posts/poll) and the live event stream
+(GET /api/v2/stream) are answered directly on the event loop, so thousands of
+idle clients only cost a future each, not a thread.
+All other routes are handed to the Flask app through asgiref's WsgiToAsgi,
+on a pool of ASGI_THREADS threads (asgiref's default would run every request
+on one shared thread).
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from backend_app import create_app
+from storage import store
+from changefeed import feed, HEARTBEAT_SECONDS
+from tasks import tasks
+from replication import start_replication
+
+LONG_POLL_PATH = "/api/v2/posts/poll"
+STREAM_PATH = "/api/v2/stream"
+MAX_POLL_TIMEOUT = 60  # seconds
+WSGI_THREADS = int(os.environ.get("ASGI_THREADS", 32))  # Flask requests handled at once
+
+wsgi_pool = ThreadPoolExecutor(WSGI_THREADS, thread_name_prefix="wsgi")
+
+
+class ThreadedWsgiToAsgiInstance(WsgiToAsgiInstance):
+    # 👇 asgiref's version is thread-sensitive: all requests would queue for one thread
+    run_wsgi_app = sync_to_async(WsgiToAsgiInstance.__dict__["run_wsgi_app"].func,
+                                 thread_sensitive=False, executor=wsgi_pool)
+
+
+class ThreadedWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi that runs requests concurrently on `wsgi_pool`."""
+
+    async def __call__(self, scope, receive, send):
+        instance = ThreadedWsgiToAsgiInstance(self.wsgi_application)
+        if hasattr(self, "duplicate_header_limit"):  # asgiref >= 3.9
+            instance.duplicate_header_limit = self.duplicate_header_limit
+        await instance(scope, receive, send)
+
+
+app = create_app(os.environ.get("BLOG_CONFIG", "production"))
+flask_app = ThreadedWsgiToAsgi(app)
+
+
+async def send_json(send, payload, status=200):
+    body = json.dumps(payload).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+            (b"cache-control", b"no-store"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def long_poll(scope, receive, send):
+    """
+    GET /api/v2/posts/poll?since=<version>&timeout=<seconds>
+
+    Returns as soon as the posts change after `since` (or right away without it),
+    otherwise after `timeout` seconds with "changed": false.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode())
+    try:
+        since = int(query["since"][0]) if "since" in query else None
+        timeout = min(float(query.get("timeout", [30])[0]), MAX_POLL_TIMEOUT)
+    except ValueError:
+        return await send_json(send, {"error": "'since' and 'timeout' must be numbers"}, 400)
+
+    try:
+        await store.refresh_async()
+    except json.JSONDecodeError:
+        return await send_json(send, {"error": "Server data is corrupted. Please contact support."}, 500)
+    if since is None:
+        return await send_json(send, {"version": store.version, "changed": True})
+
+    version = await store.wait_for_change(since, timeout)
+    await send_json(send, {"version": version, "changed": version != since})
+
+
+async def event_stream(scope, receive, send):
+    """GET /api/v2/stream — server-sent events from the change feed, without a thread per client."""
+    loop = asyncio.get_running_loop()
+    wakeup = asyncio.Event()
+    subscriber = feed.subscribe()
+    subscriber.notify = lambda: loop.call_soon_threadsafe(wakeup.set)
+    disconnected = loop.create_task(_wait_for_disconnect(receive))
+    try:
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"access-control-allow-origin", b"*"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": b"retry: 3000\n\n", "more_body": True})
+        while not disconnected.done():
+            waiter = loop.create_task(wakeup.wait())
+            await asyncio.wait({waiter, disconnected}, timeout=HEARTBEAT_SECONDS,
+                               return_when=asyncio.FIRST_COMPLETED)
+            waiter.cancel()
+            if disconnected.done():
+                break
+            wakeup.clear()
+            chunk = subscriber.drain() or b": keep-alive\n\n"
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    finally:
+        feed.unsubscribe(subscriber)
+        disconnected.cancel()
+
+
+async def _wait_for_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
+
+
+async def lifespan(scope, receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await store.refresh_async()  # parse the posts before the first request comes in
+            start_replication(app)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await asyncio.to_thread(tasks.drain)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(scope, receive, send)
+    if scope["type"] == "http" and scope["path"] == LONG_POLL_PATH and scope["method"] == "GET":
+        return await long_poll(scope, receive, send)
+    if scope["type"] == "http" and scope["path"] == STREAM_PATH and scope["method"] == "GET":
+        return await event_stream(scope, receive, send)
+    await flask_app(scope, receive, send)
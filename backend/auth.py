@@ -2,6 +2,7 @@ import json
 import os
 from flask import request, jsonify
 from functools import wraps
+from metrics import metrics
 
 USERS_FILE = "users.json"
 TOKENS = {}  # session-like storage
@@ -101,12 +102,24 @@ def register_user():
     return validate_registration(data.get("username"), data.get("password"))[1:]
 
 
+def current_user():
+    """
+    Looks up the user behind the request's 'Authorization' header.
+
+    Returns:
+        str | None: The username, or None if the token is missing or unknown.
+    """
+    token = request.headers.get("Authorization", "").replace("Bearer ", "")
+    return TOKENS.get(token) if token else None
+
+
 def token_required(f):
     """
     Decorator that ensures a route is protected by token-based authentication.
 
     Checks for a valid token in the 'Authorization' header.
     If invalid or missing, returns a 401 Unauthorized response.
+    Otherwise the username is passed to the route as its first argument.
 
     Args:
         f (function): The route function to wrap.
@@ -116,8 +129,9 @@ def token_required(f):
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = request.headers.get("Authorization", "").replace("Bearer ", "")
-        if not token or token not in TOKENS:
+        with metrics.span("auth"):
+            user = current_user()
+        if user is None:
             return jsonify({"error": "Authentication required"}), 401
-        return f(*args, **kwargs)
+        return f(user, *args, **kwargs)
     return decorated
@@ -1,267 +1,91 @@
+import os
 from flask_cors import CORS
-import json
-from datetime import datetime
-from flask import Flask, request, jsonify
-from auth import register_user, login_user, token_required
-from flask_limiter.util import get_remote_address
+from flask import Flask, jsonify, request, Response
+from config import CONFIGS
+from docs import init_docs
+from profiling import init_profiling
+from engine import EngineError
+from v1_routes import v1
 from v2_routes import v2
-from flasgger import Swagger
-from utils import load_posts, validate_post_data
+from utils import is_revalidation, posts_etag
 from rate_limit import limiter
-
-
-# 👇 Function for Identification (user or IP) managing separate limiting
-def get_token_or_ip():
-    """Returns either the Authorization token or the IP address as a fallback."""
-    return request.headers.get("Authorization") or get_remote_address()
-
-
-app = Flask(__name__, static_folder="static")
-app.register_blueprint(v2)  # v2_routes
-app.config['SWAGGER'] = {
-    "title": "The Quiet Almanac API",
-    "uiversion": 3,
-    "description": "A versioned Flask-based blog API with token authentication, "
-                   "rate limiting, and Swagger docs. Supports creating, updating, "
-                   "deleting, and searching blog posts.",
-    "version": "2.0",
-    "swagger_ui": True,
-}
-Swagger(app)
-# 👇 Enables Cross-Origin Resource Sharing for *all* routes and *all* methods
-CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
-# 👇 Activate Rate Limiting (works on all functions and routes below)
-limiter.init_app(app)
-
-
-def save_posts(posts):
-    """Saves the current list of blog posts to a JSON file."""
-    with open("blog_posts.json", "w") as file:
-        json.dump(posts, file, indent=4)
-
-
-@app.route("/", methods=['GET'])
-@limiter.exempt
-def home():
-    """Health check route for testing the API server."""
-    return "Hello, FLASK API"
-
-
-@app.route("/api/v1/posts", methods=["GET"])
-@limiter.exempt # Define Stop Limiting (maybe for all GET requests)
-def get_posts():
-    """Returns a paginated and optionally filtered/sorted list of blog posts."""
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption
-        return posts
-
-    sort_field = request.args.get("sort")
-    direction = request.args.get("direction", "asc")
-    category = request.args.get("category")
-    categories = request.args.get("categories")
-
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 5))
-
-    filtered_posts = posts.copy()
-
-    if category:
-        filtered_posts = [p for p in filtered_posts if p["category"].lower() == category.lower()]
-    elif categories:
-        category_list = [c.strip().lower() for c in categories.split(",")]
-        filtered_posts = [p for p in filtered_posts if p["category"].lower() in category_list]
-
-    if sort_field:
-        valid_fields = ["title", "content", "likes", "date", "updated", "author"]  # ✅ include "author"
-        if sort_field not in valid_fields:
-            return jsonify({"error": f"Invalid sort field. Use one of: {', '.join(valid_fields)}"}), 400
-        if direction not in ["asc", "desc"]:
-            return jsonify({"error": "Invalid direction. Use 'asc' or 'desc'."}), 400
-
-        reverse = direction == "desc"
-        filtered_posts.sort(
-            key=lambda post: (
-                post.get(sort_field, "").lower() if isinstance(post.get(sort_field), str)
-                else post.get(sort_field, "")
-            ),
-            reverse=reverse
-        )
-
-    start = (page - 1) * limit
-    end = start + limit
-    paginated_posts = filtered_posts[start:end]
-
-    return jsonify({
-        "page": page,
-        "limit": limit,
-        "total_posts": len(filtered_posts),
-        "posts": paginated_posts
-    })
-
-
-@app.route('/api/v1/posts', methods=['POST'])
-@token_required
-@limiter.limit("5 per minute") # Allows productive work but prevents Spam
-def add_post(current_user):
-    """Creates a new blog post for the logged-in user."""
-    data = request.get_json()
-    error = validate_post_data(data)
-    if error:
-        return jsonify(error), 400
-
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    new_post = {
-        "id": max([post["id"] for post in posts], default=0) + 1,
-        "author": current_user,  # 🧠 use username from token
-        "title": data["title"],
-        "content": data["content"],
-        "category": data["category"],
-        "date": datetime.now().strftime("%B %d, %Y"),
-        "likes": 0
-    }
-
-    posts.append(new_post)
-    save_posts(posts)
-
-    return jsonify(new_post), 201
-
-
-@app.route("/api/v1/posts/<int:post_id>", methods=['DELETE'])
-@token_required
-@limiter.limit("5 per minute") # Allows productive work but prevents Spam
-def delete_post(current_user, post_id):
-    """Deletes a blog post if it belongs to the current user."""
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    for post in posts:
-        if post['id'] == post_id:
-            if post['author'] != current_user:
-                return jsonify({"error": "Unauthorized to delete this post"}), 403
-            posts.remove(post)
-            save_posts(posts)
-            return jsonify({"message": f"Post {post_id} deleted"}), 200
-    return jsonify({"error": f"Post with ID {post_id} not found"}), 404
-
-
-@app.route("/api/v1/posts/<int:post_id>", methods=['PUT'])
-@limiter.limit("5 per minute") # Allows productive work but prevents Spam
-@token_required
-def update_post(current_user, post_id):
-    """Updates a blog post's title, content, or category if user owns the post."""
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    for post in posts:
-        if post['id'] == post_id:
-            if post['author'] != current_user:
-                return jsonify({"error": "Unauthorized to edit this post"}), 403
-
-            new_data = request.get_json()
-            error = validate_post_data(new_data)
-            if error:
-                return jsonify(error), 400
-
-            post['title'] = new_data['title']
-            post['content'] = new_data['content']
-            post['category'] = new_data['category']
-            post["updated"] = datetime.now().strftime("%B %d, %Y")
-
-            save_posts(posts)
-            return jsonify(post), 200
-    return jsonify({"error": f"Post with ID {post_id} not found"}), 404
-
-
-@app.route("/api/v1/posts/search", methods=['GET'])
-@limiter.limit("10 per minute")
-def search_post():
-    """Searches posts by title, content, or author."""
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    search_text = request.args.get("q", "").lower()
-
-    if not search_text:
-        return jsonify({"error": "Please provide a search term using '?q=your_query'"}), 400
-
-    results = [
-        post for post in posts
-        if search_text in post.get('title', '').lower()
-        or search_text in post.get('content', '').lower()
-        or search_text in post.get('author', '').lower()
-    ]
-
-    if not results:
-        return jsonify({"error": f"No posts found matching '{search_text}'"}), 404
-
-    return jsonify(results), 200
-
-
-@app.route("/api/v1/categories", methods=["GET"])
-@limiter.exempt
-def get_categories():
-    """Returns a unique sorted list of all categories in blog posts."""
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-    categories_set = set()
-
-    for post in posts:
-        cat = post.get("category")
-        if isinstance(cat, list):
-            categories_set.update(cat)
-        elif isinstance(cat, str):
-            categories_set.add(cat)
-
-    categories = sorted(categories_set)
-    return jsonify(categories)
-
-
-@app.route("/api/v1/posts/<int:post_id>/like", methods=["POST"])
-@limiter.limit("20 per minute") # Potential abuse, limiting required, as well
-def like_post(post_id):
-    """Increments the like count of a post by its ID."""
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    for post in posts:
-        if post["id"] == post_id:
-            post["likes"] = post.get("likes", 0) + 1
-            save_posts(posts)
-            return jsonify({"message": f"Post {post_id} liked", "likes": post["likes"]}), 200
-
-    return jsonify({"error": f"Post with ID {post_id} not found"}), 404
-
-
-'''Register & Login Part'''
-@app.route("/api/v1/register", methods=["POST"])
-@limiter.limit("3 per minute") # Vulnerable for Brute-Force-Attacks
-def register():
-    """Registers a new user with username and password."""
-    return register_user()
-
-
-@app.route("/api/v1/login", methods=["POST"])
-@limiter.limit("5 per minute") # Vulnerable for Brute-Force-Attacks
-def login():
-    """Authenticates a user and returns a token."""
-    return login_user()
-
-
-# Debug/Test-Route
-@app.route('/api/v1/secret', methods=['GET'])
-@token_required
-@limiter.limit("3 per minute")
-def secret(current_user):
-    """Protected test route to verify token authentication."""
-    return jsonify({'message': f'Welcome, {current_user}!'}), 200
+from storage import store
+from ranking import top_index
+from facets import facet_index
+from metrics import metrics
+from tasks import tasks
+from replication import init_replication
+from compression import init_compression
+
+
+def create_app(config=None):
+    """
+    Application factory.
+
+    Args:
+        config (str | type | None): A config name from config.CONFIGS ("development",
+            "production"), a config class, or None to read BLOG_CONFIG from the environment.
+
+    Returns:
+        Flask: The configured app with v1 and v2 blueprints registered.
+    """
+    if config is None or isinstance(config, str):
+        config = CONFIGS[config or os.environ.get("BLOG_CONFIG", "development")]
+
+    app = Flask(__name__, static_folder="static")
+    app.config.from_object(config)
+    app.register_blueprint(v1)  # v1_routes
+    app.register_blueprint(v2)  # v2_routes
+    init_docs(app)  # Swagger UI + spec, skipped entirely if SWAGGER_ENABLED is off
+    # 👇 Enables Cross-Origin Resource Sharing for *all* routes and *all* methods
+    CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
+    # 👇 Activate Rate Limiting (works on all functions and routes below)
+    limiter.init_app(app)
+    metrics.init_app(app)  # right after the limiter, so its check is timed as a stage
+    store.init_app(app)
+    tasks.init_app(app)
+    init_replication(app)  # primary by default, read-only replica if REPLICA_OF is set
+    init_profiling(app)  # no-op unless PROFILING_ENABLED is set
+    init_compression(app)  # gzip / brotli for large JSON bodies
+
+    @app.before_request
+    def answer_revalidations():
+        """Clients that already hold the current ETag get a 304 before any route work is done."""
+        # 👇 Trending scores decay between writes, so they are never revalidated
+        if is_revalidation() and request.args.get("by") != "trending":
+            response = app.response_class(status=304)
+            response.set_etag(posts_etag())
+            return response
+
+    @app.errorhandler(EngineError)
+    def engine_error(error):
+        """Turns errors raised by the shared engine into JSON responses."""
+        return jsonify({"error": error.message}), error.status
+
+    @app.route("/metrics", methods=['GET'])
+    @limiter.exempt
+    def prometheus_metrics():
+        """Request/stage latency histograms, storage bytes and cache hit ratios (Prometheus text)."""
+        return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+    @app.route("/", methods=['GET'])
+    @limiter.exempt
+    def home():
+        """Health check route for testing the API server."""
+        return "Hello, FLASK API"
+
+    return app
+
+
+def warm_up(app):
+    """
+    Loads the posts and builds the top-N and facet indexes, so the first
+    requests don't pay for it (and preloaded workers share them copy-on-write).
+    """
+    with app.app_context():
+        store.load()
+        top_index.sync()
+        facet_index.select()
 
 
 # @app.route('/swagger-ui/custom.css')
@@ -281,4 +105,4 @@ def secret(current_user):
 
 
 if __name__ == '__main__':
-    app.run(host="0.0.0.0", port=5021, debug=True)
+    create_app("development").run(host="0.0.0.0", port=5021, debug=True)
@@ -0,0 +1 @@
+"""Benchmarks for the blog API. Run from the backend folder, f.e. `python -m benchmarks.limiter_overhead`."""
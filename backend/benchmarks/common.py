@@ -0,0 +1,68 @@
+"""Helpers shared by the benchmarks: timing, percentiles and JSON result files."""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms, seconds=None):
+    """p50/p99/mean of latency samples (ms), plus throughput if the wall time is given."""
+    summary = {
+        "count": len(samples_ms),
+        "p50_ms": round(percentile(samples_ms, 50), 4),
+        "p99_ms": round(percentile(samples_ms, 99), 4),
+        "mean_ms": round(sum(samples_ms) / len(samples_ms), 4) if samples_ms else 0.0,
+    }
+    if seconds:
+        summary["throughput_rps"] = round(len(samples_ms) / seconds, 1)
+    return summary
+
+
+def time_calls(fn, repeat):
+    """Calls fn `repeat` times, returns the latencies in ms."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(name, params, results, path=None):
+    """Writes a result file (benchmarks/results/<name>-<timestamp>.json by default) and returns its path."""
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    document = {
+        "benchmark": name,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as file:
+        json.dump(document, file, indent=2)
+    return path
@@ -0,0 +1,36 @@
+"""
+Compares two benchmark result files (same benchmark) metric by metric.
+
+Usage (from backend/): python -m benchmarks.compare <baseline.json> <candidate.json> [metric]
+The metric defaults to p50_ms; ratios above 1 mean the candidate is slower.
+"""
+import json
+import sys
+
+
+def flatten(results, prefix=""):
+    """Yields (case path, summary dict) pairs from nested result dicts."""
+    for key, value in results.items():
+        if isinstance(value, dict) and "count" in value:
+            yield prefix + key, value
+        elif isinstance(value, dict):
+            yield from flatten(value, f"{prefix}{key}/")
+
+
+def main(baseline_path, candidate_path, metric="p50_ms"):
+    with open(baseline_path) as file:
+        baseline = dict(flatten(json.load(file)["results"]))
+    with open(candidate_path) as file:
+        candidate = dict(flatten(json.load(file)["results"]))
+    for case in sorted(baseline.keys() & candidate.keys()):
+        before, after = baseline[case].get(metric), candidate[case].get(metric)
+        if before is None or after is None:
+            continue
+        ratio = after / before if before else float("inf")
+        print(f"{case:<32} {before:10.3f} -> {after:10.3f}  x{ratio:5.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        sys.exit(__doc__)
+    main(*sys.argv[1:4])
@@ -0,0 +1,99 @@
+"""
+Bytes and CPU of response compression and of the on-disk snapshot formats.
+
+Responses: serves a synthetic corpus through the app and reports, per endpoint,
+the identity / gzip / brotli (if installed) body sizes, the time to compress a
+fresh body and the time to serve it again from the precompressed cache.
+Snapshots: size, write time and parse time of the posts file as pretty JSON
+(the old format), compact JSON and gzip-compressed compact JSON.
+
+Usage (from backend/):
+    python -m benchmarks.compression [--posts 10000] [--repeat 20]
+"""
+import argparse
+import json
+import os
+import tempfile
+import compression
+from benchmarks.common import summarize, time_calls, write_results
+from benchmarks.corpus import generate_posts, write_corpus
+from storage import encode_posts, read_posts
+
+ENDPOINTS = [
+    ("page_5", "/api/v2/posts?limit=5"),
+    ("page_50", "/api/v2/posts?limit=50"),
+    ("search", "/api/v2/posts/search?q=almanac"),
+    ("categories", "/api/v2/categories"),
+]
+
+
+def response_sizes(posts_file, repeat):
+    from backend_app import create_app
+    from config import ProductionConfig
+
+    class BenchConfig(ProductionConfig):
+        POSTS_FILE = posts_file
+        RATELIMIT_ENABLED = False
+
+    client = create_app(BenchConfig).test_client()
+    results = {}
+    for name, path in ENDPOINTS:
+        identity = len(client.get(path).data)
+        results[name] = {"identity_bytes": identity}
+        for encoding, encode in compression.ENCODERS.items():
+            headers = {"Accept-Encoding": encoding}
+            results[name][f"{encoding}_bytes"] = len(client.get(path, headers=headers).data)
+            body = client.get(path).data
+            results[name][f"{encoding}_compress"] = summarize(time_calls(lambda: encode(body), repeat))
+            results[name][f"{encoding}_cached_request"] = summarize(
+                time_calls(lambda: client.get(path, headers=headers), repeat))
+        results[name]["identity_request"] = summarize(time_calls(lambda: client.get(path), repeat))
+    return results
+
+
+def snapshot_formats(posts, repeat):
+    directory = tempfile.mkdtemp()
+    results = {}
+    formats = {
+        "pretty": ("posts.json", lambda: json.dumps(posts, indent=4).encode()),
+        "compact": ("posts.json", lambda: encode_posts(posts, "posts.json")),
+        "gzip": ("posts.json.gz", lambda: encode_posts(posts, "posts.json.gz")),
+    }
+    for name, (filename, encode) in formats.items():
+        path = os.path.join(directory, filename)
+        data = encode()
+        with open(path, "wb") as file:
+            file.write(data)
+        results[name] = {
+            "bytes": len(data),
+            "encode": summarize(time_calls(encode, repeat)),
+            "parse": summarize(time_calls(lambda: read_posts(path), repeat)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/compression-<time>.json)")
+    args = parser.parse_args()
+
+    posts_file = os.path.join(tempfile.mkdtemp(), "posts.json")
+    write_corpus(posts_file, args.posts)
+    results = {
+        "responses": response_sizes(posts_file, args.repeat),
+        "snapshots": snapshot_formats(generate_posts(args.posts), max(3, args.repeat // 4)),
+    }
+    for name, row in results["responses"].items():
+        sizes = "  ".join(f"{key[:-6]} {value:>9}" for key, value in row.items() if key.endswith("_bytes"))
+        cpu = "  ".join(f"{encoding} {row[f'{encoding}_compress']['p50_ms']:.3f} ms" for encoding in compression.ENCODERS)
+        print(f"{name:<11} {sizes}   compress p50: {cpu}")
+    for name, row in results["snapshots"].items():
+        print(f"snapshot {name:<8} {row['bytes']:>11} bytes  encode p50 {row['encode']['p50_ms']:9.1f} ms"
+              f"  parse p50 {row['parse']['p50_ms']:9.1f} ms")
+    print("results written to", write_results("compression", vars(args), results, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Synthetic corpus generator for benchmarks.
+
+Categories and authors follow a Zipf-like distribution (a few are very common),
+content length varies, and comment threads are heavy-tailed: most posts have
+none or a few comments, some have hundreds.
+
+Usage (from backend/): python -m benchmarks.corpus <count> [output.json] [seed]
+"""
+import json
+import random
+import sys
+
+CATEGORIES = ["Technology", "Science", "Philosophy", "Travel", "Astronomy", "Chemistry", "Quantum Physics",
+              "History", "Art", "Music", "Cooking", "Sports", "Politics", "Health", "Economics", "Poetry"]
+WORDS = ("water anomaly quiet almanac star orbit light ocean theory signal garden river mountain city "
+         "memory engine thought atom wave field proof model market music bread winter summer").split()
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August",
+          "September", "October", "November", "December"]
+
+
+def _zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+def _date(rng):
+    return f"{rng.choice(MONTHS)} {rng.randint(1, 28):02d}, {rng.randint(2020, 2025)}"
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def generate_posts(count, seed=42, authors=500):
+    """Returns `count` posts shaped like the ones in blog_posts.json."""
+    rng = random.Random(seed)
+    author_names = [f"user{i}" for i in range(authors)]
+    categories = rng.choices(CATEGORIES, weights=_zipf_weights(len(CATEGORIES)), k=count)
+    post_authors = rng.choices(author_names, weights=_zipf_weights(authors), k=count)
+    posts = []
+    for index in range(count):
+        comment_count = min(int(rng.paretovariate(1.2)) - 1, 500)
+        post = {
+            "id": index + 1,
+            "author": post_authors[index],
+            "title": _text(rng, rng.randint(3, 8)).title(),
+            "content": _text(rng, rng.randint(20, 200)),
+            "date": _date(rng),
+            "category": categories[index],
+            "likes": int(rng.paretovariate(1.5)) - 1,
+            "comments": [
+                {"author": rng.choice(author_names + ["Anonymous"]), "text": _text(rng, rng.randint(2, 30)),
+                 "date": _date(rng)}
+                for _ in range(comment_count)
+            ],
+        }
+        if rng.random() < 0.2:
+            post["updated"] = _date(rng)
+        posts.append(post)
+    return posts
+
+
+def write_corpus(path, count, seed=42):
+    with open(path, "w") as file:
+        json.dump(generate_posts(count, seed), file)
+
+
+if __name__ == "__main__":
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    target = sys.argv[2] if len(sys.argv) > 2 else f"corpus-{total}.json"
+    write_corpus(target, total, int(sys.argv[3]) if len(sys.argv) > 3 else 42)
+    print(f"{total} posts written to {target}")
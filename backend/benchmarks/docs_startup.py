@@ -0,0 +1,53 @@
+"""
+Measures what the Swagger docs cost: import + create_app time with docs on and
+off (fresh interpreter each run, median of a few runs), and the first (built)
+vs. later (cached) /apispec_1.json request.
+
+Usage (from backend/): python -m benchmarks.docs_startup
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+from backend_app import create_app
+from config import DevelopmentConfig
+
+STARTUP_SNIPPET = (
+    "import time; start = time.perf_counter(); "
+    "from backend_app import create_app; "
+    "create_app('production'); "
+    "print(time.perf_counter() - start)"
+)
+
+
+def startup_ms(docs_enabled, runs=5):
+    env = {**os.environ, "SWAGGER_ENABLED": "1" if docs_enabled else "0"}
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-W", "ignore", "-c", STARTUP_SNIPPET],
+                                capture_output=True, text=True, check=True, env=env).stdout
+        timings.append(float(output.strip().splitlines()[-1]) * 1000)
+    return statistics.median(timings)
+
+
+def spec_request_ms():
+    client = create_app(DevelopmentConfig).test_client()
+    timings = []
+    for _ in range(5):
+        start = time.perf_counter()
+        client.get("/apispec_1.json")
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings[0], statistics.median(timings[1:])
+
+
+def main():
+    print(f"import + create_app, docs off: {startup_ms(False):7.1f} ms")
+    print(f"import + create_app, docs on:  {startup_ms(True):7.1f} ms")
+    first, cached = spec_request_ms()
+    print(f"/apispec_1.json first request: {first:7.1f} ms")
+    print(f"/apispec_1.json cached:        {cached:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
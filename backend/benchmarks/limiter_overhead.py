@@ -0,0 +1,73 @@
+"""
+Measures the per-request overhead of rate limiting.
+
+Compares a route without limits, a route with a classic Flask-Limiter limit
+(storage hit per request), a route behind the in-process hot limit, and a
+conditional GET answered with 304 through the limiter fast path.
+
+Usage (from backend/): python -m benchmarks.limiter_overhead [requests]
+"""
+import sys
+import time
+from backend_app import create_app
+from rate_limit import limiter, hot_limit, HotLimit
+
+app = create_app("production")
+
+
+@app.route("/bench/exempt")
+@limiter.exempt
+def bench_exempt():
+    return "ok"
+
+
+@app.route("/bench/limited")
+@limiter.limit("1000000 per hour")
+def bench_limited():
+    return "ok"
+
+
+@app.route("/bench/hot")
+@limiter.exempt
+@hot_limit("1000000 per hour")
+def bench_hot():
+    return "ok"
+
+
+def per_request_us(client, path, n, headers=None):
+    client.get(path, headers=headers)  # warm up
+    start = time.perf_counter()
+    for _ in range(n):
+        client.get(path, headers=headers)
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main(n=2000):
+    client = app.test_client()
+    results = {
+        "exempt route": per_request_us(client, "/bench/exempt", n),
+        "limiter.limit route": per_request_us(client, "/bench/limited", n),
+        "hot_limit route": per_request_us(client, "/bench/hot", n),
+    }
+    etag = client.get("/api/v2/posts").headers["ETag"]
+    results["GET /api/v2/posts (200)"] = per_request_us(client, "/api/v2/posts", n)
+    results["GET /api/v2/posts (304)"] = per_request_us(client, "/api/v2/posts", n, {"If-None-Match": etag})
+
+    with app.app_context():
+        hot = HotLimit("1000000 per hour")
+        strategy = limiter.limiter
+        start = time.perf_counter()
+        for _ in range(n * 10):
+            hot.acquire("bench")
+        results["HotLimit.acquire (call)"] = (time.perf_counter() - start) / (n * 10) * 1e6
+        start = time.perf_counter()
+        for _ in range(n * 10):
+            strategy.hit(hot.item, "bench")
+        results["limiter storage hit (call)"] = (time.perf_counter() - start) / (n * 10) * 1e6
+
+    for name, micros in results.items():
+        print(f"{name:<32} {micros:8.1f} µs")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,119 @@
+"""
+In-process load driver for the blog API.
+
+Serves a synthetic corpus through the real app (Flask test client, rate limits
+off) or drives a running server (--url), keeps N client threads busy on each
+endpoint for a few seconds and reports p50/p99 latency and throughput.
+
+Usage (from backend/):
+    python -m benchmarks.load [--posts 10000] [--seconds 3] [--clients 4] [--url http://127.0.0.1:5021]
+"""
+import argparse
+import http.client
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse
+from benchmarks.common import summarize, write_results
+from benchmarks.corpus import write_corpus
+
+ENDPOINTS = [
+    ("list", "GET", "/api/v2/posts?limit=10"),
+    ("list_sorted", "GET", "/api/v2/posts?sort=likes&direction=desc&limit=10"),
+    ("list_category", "GET", "/api/v2/posts?category=Science&limit=10"),
+    ("search", "GET", "/api/v2/posts/search?q=almanac"),
+    ("categories", "GET", "/api/v2/categories"),
+    ("like", "POST", "/api/v2/posts/1/like"),
+]
+
+
+def test_client_factory(posts_file):
+    from backend_app import create_app
+    from config import ProductionConfig
+
+    class LoadConfig(ProductionConfig):
+        POSTS_FILE = posts_file
+        RATELIMIT_ENABLED = False
+        SWAGGER_ENABLED = False
+
+    app = create_app(LoadConfig)
+
+    def request(method, path):
+        return app.test_client().open(path, method=method).status_code
+    return request
+
+
+def http_factory(url):
+    parsed = urlparse(url)
+    local = threading.local()
+
+    def request(method, path):
+        if not hasattr(local, "connection"):
+            local.connection = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=10)
+        local.connection.request(method, path)
+        response = local.connection.getresponse()
+        response.read()
+        return response.status
+    return request
+
+
+def drive(request, method, path, seconds, clients):
+    samples, errors = [], []
+    lock = threading.Lock()
+    stop = time.monotonic() + seconds
+
+    def client():
+        own, failed = [], 0
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            status = request(method, path)
+            own.append((time.perf_counter() - start) * 1000)
+            failed += status >= 400
+        with lock:
+            samples.extend(own)
+            errors.append(failed)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    summary = summarize(samples, time.perf_counter() - started)
+    summary["errors"] = sum(errors)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=10000, help="corpus size for the in-process app")
+    parser.add_argument("--seconds", type=float, default=3, help="load duration per endpoint")
+    parser.add_argument("--clients", type=int, default=4, help="concurrent client threads")
+    parser.add_argument("--url", help="drive a running server instead of the in-process app")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.url:
+            request = http_factory(args.url)
+        else:
+            posts_file = os.path.join(tmp, "blog_posts.json")
+            write_corpus(posts_file, args.posts)
+            request = test_client_factory(posts_file)
+
+        results = {}
+        for name, method, path in ENDPOINTS:
+            results[name] = drive(request, method, path, args.seconds, args.clients)
+            summary = results[name]
+            print(f"{name:<14} {summary['throughput_rps']:8.1f} req/s  p50 {summary['p50_ms']:8.2f} ms  "
+                  f"p99 {summary['p99_ms']:8.2f} ms  errors {summary['errors']}")
+
+    params = {"posts": None if args.url else args.posts, "url": args.url,
+              "seconds": args.seconds, "clients": args.clients}
+    path = write_results("load", params, results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
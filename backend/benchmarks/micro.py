@@ -0,0 +1,52 @@
+"""
+Micro-benchmarks of the engine's hot paths: filter, sort, search and serialize,
+on synthetic corpora of different sizes.
+
+Usage (from backend/):
+    python -m benchmarks.micro [--sizes 10000,100000] [--repeat 20] [--output results.json]
+"""
+import argparse
+import json
+import engine
+from benchmarks.common import summarize, time_calls, write_results
+from benchmarks.corpus import generate_posts
+
+
+def cases(posts):
+    """Named callables, each one unit of work on `posts`."""
+    page = engine.run_query(engine.PostQuery(limit=20), posts).to_dict()
+    return {
+        "filter_category": lambda: engine.run_query(engine.PostQuery(categories=("science",)), posts),
+        "filter_categories": lambda: engine.run_query(engine.PostQuery(categories=("science", "travel", "art")), posts),
+        "sort_likes_desc": lambda: engine.run_query(engine.PostQuery(sort="likes", direction="desc"), posts),
+        "sort_title_asc": lambda: engine.run_query(engine.PostQuery(sort="title"), posts),
+        "search": lambda: engine.search_posts("almanac", posts),
+        "list_categories": lambda: engine.list_categories(posts),
+        "serialize_page": lambda: json.dumps(page),
+        "serialize_all": lambda: json.dumps(posts),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10000,100000", help="comma-separated corpus sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per case (fewer for big corpora)")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/micro-<time>.json)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = {}
+    for size in sizes:
+        posts = generate_posts(size)
+        repeat = max(3, args.repeat * 10000 // max(size, 10000))
+        results[str(size)] = {}
+        for name, fn in cases(posts).items():
+            summary = summarize(time_calls(fn, repeat))
+            results[str(size)][name] = summary
+            print(f"{size:>8} {name:<18} p50 {summary['p50_ms']:10.3f} ms  p99 {summary['p99_ms']:10.3f} ms")
+    path = write_results("micro", {"sizes": sizes, "repeat": args.repeat}, results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
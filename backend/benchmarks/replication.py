@@ -0,0 +1,105 @@
+"""
+Replication lag with one primary and N read replicas, all local processes.
+
+Starts the primary (uvicorn, on a synthetic corpus) and the replicas
+(REPLICA_OF pointing at it), then likes posts on the primary and measures how
+long each write takes to show up on every replica. Also times writes sent to
+a replica, which are forwarded to the primary and wait until the replica has
+caught up (read-your-writes).
+
+Usage (from backend/):
+    python -m benchmarks.replication [--replicas 2] [--writes 50] [--posts 1000]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from benchmarks.common import summarize, write_results
+from benchmarks.corpus import write_corpus
+
+BASE_PORT = 5110
+
+
+def start_server(port, env):
+    command = [sys.executable, "-m", "uvicorn", "asgi:application", "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(command, env={**os.environ, "RATELIMIT_ENABLED": "0", **env},
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def request(port, path, method="GET"):
+    with urllib.request.urlopen(urllib.request.Request(f"http://127.0.0.1:{port}{path}", method=method),
+                                timeout=10) as response:
+        return json.load(response), response.headers
+
+
+def wait_until_up(port, deadline=20):
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
+        try:
+            return request(port, "/api/v2/posts/changes?since=0")[0]["version"]
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"server on port {port} did not come up")
+
+
+def wait_for_version(port, version, deadline=10):
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
+        if request(port, f"/api/v2/posts/changes?since={version}")[0]["version"] >= version:
+            return
+        time.sleep(0.001)
+    raise RuntimeError(f"replica on port {port} never reached version {version}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--writes", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=1000)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    posts_file = os.path.join(tempfile.mkdtemp(), "posts.json")
+    write_corpus(posts_file, args.posts)
+    primary_port = BASE_PORT
+    replica_ports = [BASE_PORT + 1 + i for i in range(args.replicas)]
+    processes = [start_server(primary_port, {"POSTS_FILE": posts_file})]
+    try:
+        wait_until_up(primary_port)
+        primary_url = f"http://127.0.0.1:{primary_port}"
+        processes += [start_server(port, {"REPLICA_OF": primary_url}) for port in replica_ports]
+        for port in replica_ports:
+            wait_until_up(port)
+
+        lag_ms, forwarded_ms = [], []
+        for i in range(args.writes):
+            start = time.perf_counter()
+            _, headers = request(primary_port, f"/api/v2/posts/{i % args.posts + 1}/like", "POST")
+            version = int(headers["X-Store-Version"])
+            for port in replica_ports:
+                wait_for_version(port, version)
+            lag_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            request(replica_ports[i % len(replica_ports)], f"/api/v2/posts/{i % args.posts + 1}/like", "POST")
+            forwarded_ms.append((time.perf_counter() - start) * 1000)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+    results = {
+        "write_visible_on_all_replicas": summarize(lag_ms),
+        "forwarded_write_read_your_writes": summarize(forwarded_ms),
+    }
+    for name, summary in results.items():
+        print(f"{name:34} p50 {summary['p50_ms']:8.2f} ms   p99 {summary['p99_ms']:8.2f} ms")
+    print("results written to", write_results("replication", vars(args), results, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Measures startup time and steady-state throughput of the production server profile.
+
+Startup: time to import the backend, build the app with create_app() and warm up
+the store, in a fresh interpreter (median of a few runs).
+Throughput: starts the server, keeps N client threads busy on one endpoint for a
+few seconds and reports requests per second.
+
+Usage (from backend/):
+    python -m benchmarks.server_profile [gunicorn|uvicorn] [seconds] [clients]
+"""
+import http.client
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+PORT = 5099
+PATH = "/api/v2/posts?limit=5"
+SERVERS = {
+    "gunicorn": ["gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{PORT}",
+                 "--access-logfile", "/dev/null", "wsgi:app"],
+    "uvicorn": ["uvicorn", "asgi:application", "--port", str(PORT), "--log-level", "warning"],
+}
+STARTUP_SNIPPET = (
+    "import time; start = time.perf_counter(); "
+    "from backend_app import create_app, warm_up; "
+    "app = create_app('production'); warm_up(app); "
+    "print(time.perf_counter() - start)"
+)
+
+
+def startup_seconds(runs=5):
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-W", "ignore", "-c", STARTUP_SNIPPET],
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def wait_for_port(deadline=20):
+    start = time.monotonic()
+    while time.monotonic() - start < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=1)
+            connection.request("GET", "/")
+            connection.getresponse().read()
+            return time.monotonic() - start
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not come up")
+
+
+def hammer(seconds, clients):
+    counts = [0] * clients
+    stop = time.monotonic() + seconds
+
+    def client(index):
+        connection = http.client.HTTPConnection("127.0.0.1", PORT, timeout=5)
+        while time.monotonic() < stop:
+            connection.request("GET", PATH)
+            connection.getresponse().read()
+            counts[index] += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(counts) / seconds
+
+
+def main(server="gunicorn", seconds=5, clients=8):
+    print(f"create_app + warm_up (median): {startup_seconds() * 1000:.1f} ms")
+    process = subprocess.Popen(SERVERS[server], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        print(f"{server} ready to serve after:  {wait_for_port() * 1000:.0f} ms")
+        print(f"steady state GET {PATH}: {hammer(seconds, clients):.0f} req/s ({clients} clients)")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    main(args[0] if args else "gunicorn",
+         float(args[1]) if len(args) > 1 else 5,
+         int(args[2]) if len(args) > 2 else 8)
@@ -0,0 +1,63 @@
+"""
+Sharded storage: cold load, single-post writes and cross-shard queries for
+different shard counts, on one synthetic corpus.
+
+Usage (from backend/):
+    python -m benchmarks.shards [--posts 100000] [--shards 1,4,8] [--by id|category] [--repeat 10]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import engine
+from storage import store
+from benchmarks.common import summarize, time_calls, write_results
+from benchmarks.corpus import write_corpus
+
+
+def cases(post_ids):
+    likes = iter(post_ids * 1000)
+    return {
+        "like": lambda: engine.like_post(next(likes)),
+        "list_sorted": lambda: engine.run_query(engine.PostQuery(sort="likes", direction="desc", limit=10)),
+        "list_category": lambda: engine.run_query(engine.PostQuery(categories=("science",), limit=10)),
+        "search": lambda: engine.search_posts("almanac"),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--shards", default="1,4,8", help="comma-separated shard counts")
+    parser.add_argument("--by", default="id", choices=("id", "category"))
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", help="result file (default: benchmarks/results/shards-<time>.json)")
+    args = parser.parse_args()
+
+    corpus = os.path.join(tempfile.mkdtemp(), "corpus.json")
+    write_corpus(corpus, args.posts)
+    results = {}
+    for count in [int(n) for n in args.shards.split(",")]:
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "posts.json")
+        shutil.copy(corpus, path)
+        store.configure(path, count, args.by)
+        store.refresh()  # splits the corpus into shard files
+        store.configure(path, count, args.by)
+
+        start = time.perf_counter()
+        store.refresh()
+        results[count] = {"cold_load": summarize([(time.perf_counter() - start) * 1000])}
+        post_ids = [post["id"] for post in store.load()[::max(1, args.posts // 50)]]
+        for name, fn in cases(post_ids).items():
+            results[count][name] = summarize(time_calls(fn, args.repeat))
+        for name, summary in results[count].items():
+            print(f"{count:>3} shards {name:<14} p50 {summary['p50_ms']:10.3f} ms  p99 {summary['p99_ms']:10.3f} ms")
+        shutil.rmtree(directory)
+    path = write_results("shards", vars(args), results, args.output)
+    print(f"results written to {path}")
+
+
+if __name__ == "__main__":
+    main()
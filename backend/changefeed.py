@@ -0,0 +1,89 @@
+"""
+Change feed: fans out compact delta events about posts to stream subscribers.
+
+The engine publishes one event per mutation (post.created, post.updated,
+post.deleted, post.liked, comment.added). Each event is encoded as a
+server-sent-events chunk once and the same bytes are queued for every
+subscriber. Queues are bounded: a subscriber that falls behind loses its
+backlog and gets a single `resync` event, telling the client to reload.
+Streams are served by asgi.py on the event loop; WSGI servers answer 501.
+"""
+import json
+import threading
+from collections import deque
+
+BUFFER_SIZE = 256        # events queued per subscriber before it has to resync
+HEARTBEAT_SECONDS = 15   # comment line sent to idle streams to keep proxies from closing them
+RESYNC_EVENT = b"event: resync\ndata: {}\n\n"
+
+
+def encode_event(event_id, event_type, data):
+    return f"id: {event_id}\nevent: {event_type}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+class Subscriber:
+    """
+    One stream client. `notify` is called (from any thread) whenever new data
+    is queued; blocking consumers use the built-in event, async consumers
+    swap in a callback that wakes their event loop.
+    """
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        self.buffer_size = buffer_size
+        self.queue = deque()
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.notify = self.ready.set
+
+    def push(self, chunk):
+        with self.lock:
+            if len(self.queue) >= self.buffer_size:
+                self.queue.clear()
+                self.queue.append(RESYNC_EVENT)
+            elif not self.queue or self.queue[0] is not RESYNC_EVENT:
+                self.queue.append(chunk)
+        self.notify()
+
+    def drain(self):
+        """Returns everything queued so far as one bytes chunk (b"" if nothing)."""
+        with self.lock:
+            chunks, self.queue = self.queue, deque()
+            self.ready.clear()
+        return b"".join(chunks)
+
+    def wait(self, timeout):
+        """Blocks until data is queued or the timeout runs out."""
+        self.ready.wait(timeout)
+
+
+class ChangeFeed:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.last_id = 0
+
+    def subscribe(self, buffer_size=BUFFER_SIZE):
+        subscriber = Subscriber(buffer_size)
+        with self.lock:
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def publish(self, event_type, data, event_id=None):
+        """
+        Encodes the event once and queues it for every subscriber.
+        `event_id` defaults to a counter; the engine passes the store version, so a
+        reconnecting client can catch up with /api/v2/posts/changes?since=<Last-Event-ID>.
+        """
+        with self.lock:
+            self.last_id = event_id if event_id is not None else self.last_id + 1
+            chunk = encode_event(self.last_id, event_type, data)
+            subscribers = list(self.subscribers)
+        for subscriber in subscribers:
+            subscriber.push(chunk)
+
+
+feed = ChangeFeed()
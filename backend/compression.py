@@ -0,0 +1,113 @@
+"""
+Negotiated response compression.
+
+JSON and text responses of at least COMPRESS_MIN_SIZE bytes are compressed with
+brotli (if the `brotli` package is installed and the client accepts it) or
+gzip. Responses that carry an ETag (the cached GET routes) are compressed once
+per body and encoding: the result is kept in a small LRU cache keyed by a digest
+of the uncompressed body, so hot pages are served precompressed and a cached
+body can never outlive the data it was built from. The ETag is made weak, as the compressed bytes differ
+from the identity representation; revalidation compares weakly anyway.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+from threading import Lock
+from flask import request
+from metrics import metrics
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+COMPRESS_MIN_SIZE = 1024  # bytes; smaller bodies aren't worth the CPU or the header overhead
+COMPRESS_LEVEL = 6        # gzip level; brotli uses quality 5 (comparable speed, smaller output)
+CACHE_SIZE = 256          # precompressed bodies kept
+COMPRESSIBLE = ("application/json", "text/html", "text/plain", "text/css", "application/javascript")
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=5)
+
+
+ENCODERS = {"gzip": _gzip}
+if brotli is not None:
+    ENCODERS = {"br": _brotli, **ENCODERS}  # first one the client accepts wins
+
+
+class CompressedCache:
+    """LRU of compressed bodies keyed by (body digest, encoding)."""
+
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            body = self.entries.get(key)
+            if body is not None:
+                self.entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self.lock:
+            self.entries[key] = body
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+
+cache = CompressedCache()
+
+
+def init_compression(app):
+    """Registers the compression hook unless COMPRESSION_ENABLED is off."""
+    if app.config.get("COMPRESSION_ENABLED", True):
+        app.after_request(compress_response)
+
+
+def choose_encoding():
+    """Returns the best encoding the client accepts, or None."""
+    accepted = request.accept_encodings
+    for encoding in ENCODERS:
+        if accepted[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or "Content-Encoding" in response.headers or response.mimetype not in COMPRESSIBLE):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = choose_encoding()
+    if encoding is None or (response.content_length or 0) < COMPRESS_MIN_SIZE:
+        return response
+
+    size = response.content_length
+    etag, _ = response.get_etag()
+    data = response.get_data()
+    # 👇 Not the ETag: it may be older than the body, and two bodies can carry the same one
+    key = (hashlib.blake2b(data, digest_size=16).digest(), encoding) if etag else None
+    body = cache.get(key) if key else None
+    if key:
+        metrics.cache_result("compressed", body is not None)
+    if body is None:
+        with metrics.span(f"compress.{encoding}"):
+            body = ENCODERS[encoding](data)
+        if key:
+            cache.put(key, body)
+    metrics.inc("response_bytes_uncompressed_total", size, encoding=encoding)
+    metrics.inc("response_bytes_compressed_total", len(body), encoding=encoding)
+
+    response.set_data(body)
+    response.headers["Content-Encoding"] = encoding
+    if etag:
+        response.set_etag(etag, weak=True)
+    return response
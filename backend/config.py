@@ -0,0 +1,48 @@
+import os
+
+
+class Config:
+    """Settings shared by all environments."""
+    DEBUG = False
+    # 👇 Set REPLICA_OF to the primary's URL to run as a read-only replica (see replication.py)
+    REPLICA_OF = os.environ.get("REPLICA_OF")
+    REPLICA_WRITES = os.environ.get("REPLICA_WRITES", "forward")  # or "reject"
+    REPLICATION_SECRET = os.environ.get("REPLICATION_SECRET")  # shared by primary and replicas
+    POSTS_FILE = None if REPLICA_OF else os.environ.get("POSTS_FILE", "blog_posts.json.gz")  # replicas: memory only
+    SHARDS = int(os.environ.get("SHARDS", 1))  # >1 splits POSTS_FILE into blog_posts.<n>.json.gz files
+    SHARD_BY = os.environ.get("SHARD_BY", "id")  # "id" (ranges of ids) or "category" (hash)
+    SWAGGER_ENABLED = True
+    SWAGGER_SPEC_FILE = os.environ.get("SWAGGER_SPEC_FILE")  # precompiled spec, see docs.py
+    SWAGGER = {
+        "title": "The Quiet Almanac API",
+        "uiversion": 3,
+        "description": "A versioned Flask-based blog API with token authentication, "
+                       "rate limiting, and Swagger docs. Supports creating, updating, "
+                       "deleting, and searching blog posts.",
+        "version": "2.0",
+        "swagger_ui": True,
+    }
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED") == "1"  # see profiling.py
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+    ADMIN_USERS = tuple(u for u in os.environ.get("ADMIN_USERS", "").split(",") if u)
+    TASK_WORKERS = int(os.environ.get("TASK_WORKERS", 2))  # background task threads, see tasks.py
+    TASK_QUEUE_SIZE = int(os.environ.get("TASK_QUEUE_SIZE", 1000))
+    COMPRESSION_ENABLED = os.environ.get("COMPRESSION_ENABLED", "1") == "1"  # gzip/brotli, see compression.py
+    RATELIMIT_ENABLED = os.environ.get("RATELIMIT_ENABLED", "1") == "1"
+    # 👇 Workers must share limits, so point this at redis/memcached in a real deployment
+    RATELIMIT_STORAGE_URI = os.environ.get("RATELIMIT_STORAGE_URI", "memory://")
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+
+
+class ProductionConfig(Config):
+    DEBUG = False  # no debugger, no reloader
+    SWAGGER_ENABLED = os.environ.get("SWAGGER_ENABLED") == "1"  # API-only workers by default
+
+
+CONFIGS = {
+    "development": DevelopmentConfig,
+    "production": ProductionConfig,
+}
@@ -0,0 +1,72 @@
+"""
+API docs (Swagger UI at /apidocs, OpenAPI spec at /apispec_1.json) via flasgger.
+
+flasgger is only imported when docs are enabled, so API-only workers
+(SWAGGER_ENABLED = False) skip its import and its per-request hooks.
+The spec is built on first access and cached, or read from a file
+precompiled with:  python -m docs [apispec.json]
+"""
+import json
+import os
+import sys
+
+
+def swag_from(specs):
+    """
+    Lightweight stand-in for flasgger.swag_from.
+
+    Only attaches the spec dict to the view (where flasgger looks for it when
+    building the spec), so importing the routes doesn't import flasgger.
+    """
+    def decorator(function):
+        function.specs_dict = specs
+        return function
+    return decorator
+
+
+def init_docs(app):
+    """
+    Sets up Swagger for the app if SWAGGER_ENABLED is set.
+
+    Returns:
+        Swagger | None: The flasgger extension, or None when docs are disabled.
+    """
+    if not app.config.get("SWAGGER_ENABLED", True):
+        return None
+    from flasgger import Swagger
+
+    class CachedSwagger(Swagger):
+        """Builds each spec once (also in debug mode) or loads it from SWAGGER_SPEC_FILE."""
+
+        def get_apispecs(self, endpoint="apispec_1"):
+            cache = self.__dict__.setdefault("spec_cache", {})
+            if endpoint not in cache:
+                spec_file = self.app.config.get("SWAGGER_SPEC_FILE")
+                if spec_file and os.path.exists(spec_file):
+                    with open(spec_file, "r") as file:
+                        cache[endpoint] = json.load(file)
+                else:
+                    cache[endpoint] = super().get_apispecs(endpoint)
+            return cache[endpoint]
+
+    return CachedSwagger(app)
+
+
+def export_spec(app, path):
+    """Writes the OpenAPI spec of the app to `path`, f.e. at build time."""
+    with app.test_request_context():
+        spec = app.swag.get_apispecs()
+    with open(path, "w") as file:
+        json.dump(spec, file, indent=2)
+
+
+if __name__ == "__main__":
+    from backend_app import create_app
+    from config import DevelopmentConfig
+
+    class ExportConfig(DevelopmentConfig):
+        SWAGGER_SPEC_FILE = None  # always build from the routes
+
+    target = sys.argv[1] if len(sys.argv) > 1 else "apispec.json"
+    export_spec(create_app(ExportConfig), target)
+    print(f"OpenAPI spec written to {target}")
@@ -0,0 +1,546 @@
+"""
+Query and mutation engine shared by the v1 and v2 blueprints.
+
+Routes parse the request into a PostQuery (or pass the JSON body), call one of
+the functions below and serialize the result. Errors are raised as EngineError
+and turned into JSON responses by the app's error handler.
+
+List and search queries run per storage shard (scatter) and k-way merge the
+sorted partial results (gather); with one shard that is just the plain list.
+"""
+import base64
+import binascii
+import heapq
+import json
+import threading
+from collections import Counter, deque
+from itertools import chain, dropwhile, islice
+from dataclasses import dataclass
+from datetime import datetime
+from storage import store, scatter
+from metrics import metrics
+from changefeed import feed
+from tasks import tasks
+from ranking import top_index, RANKINGS
+from facets import facet_index, count_facets
+from utils import validate_post_data
+
+SORT_FIELDS = ("title", "content", "likes", "date", "updated", "author")
+DIRECTIONS = ("asc", "desc")
+MAX_TOP = 100
+POST_FIELDS = ("id", "author", "title", "content", "category", "date", "likes", "updated", "comments")
+FACETS = ("category", "author")
+
+
+class EngineError(Exception):
+    """A request the engine can't serve, with the HTTP status to answer with."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@dataclass(frozen=True)
+class PostQuery:
+    """
+    A typed list query.
+
+    Attributes:
+        categories (tuple[str, ...]): Lowercased categories to keep (empty = all).
+        sort (str | None): One of SORT_FIELDS, or None for storage order.
+        direction (str): "asc" or "desc".
+        page (int): 1-based page number, ignored when a cursor is given.
+        limit (int): Posts per page.
+        cursor (str | None): Opaque position from a previous result's next_cursor.
+        fields (tuple[str, ...] | None): Projection, None for whole posts.
+        authors (tuple[str, ...]): Lowercased authors to keep (empty = all).
+        facets (tuple[str, ...]): FACETS to count posts per value for, within the result.
+    """
+    categories: tuple = ()
+    sort: str | None = None
+    direction: str = "asc"
+    page: int = 1
+    limit: int = 5
+    cursor: str | None = None
+    fields: tuple | None = None
+    authors: tuple = ()
+    facets: tuple = ()
+
+    @classmethod
+    def from_args(cls, args):
+        """Builds a query from request args, raising EngineError on invalid input."""
+        category_list = _value_list(args, "category", "categories")
+        author_list = _value_list(args, "author", "authors")
+
+        sort_field = args.get("sort") or None
+        direction = args.get("direction", "asc")
+        if sort_field and sort_field not in SORT_FIELDS:
+            raise EngineError(f"Invalid sort field. Use one of: {', '.join(SORT_FIELDS)}")
+        if direction not in DIRECTIONS:
+            raise EngineError("Invalid direction. Use 'asc' or 'desc'.")
+
+        try:
+            page = int(args.get("page", 1))
+            limit = int(args.get("limit", 5))
+        except ValueError:
+            raise EngineError("'page' and 'limit' must be integers")
+        if page < 1 or limit < 1:
+            raise EngineError("'page' and 'limit' must be positive")
+
+        fields = None
+        if args.get("fields"):
+            fields = tuple(f.strip() for f in args["fields"].split(","))
+            unknown = [f for f in fields if f not in POST_FIELDS]
+            if unknown:
+                raise EngineError(f"Unknown fields: {', '.join(unknown)}. Use any of: {', '.join(POST_FIELDS)}")
+
+        facets = ()
+        if args.get("facets"):
+            facets = tuple(f.strip() for f in args["facets"].split(","))
+            unknown = [f for f in facets if f not in FACETS]
+            if unknown:
+                raise EngineError(f"Unknown facets: {', '.join(unknown)}. Use any of: {', '.join(FACETS)}")
+
+        return cls(category_list, sort_field, direction, page, limit, args.get("cursor") or None, fields,
+                   author_list, facets)
+
+
+def _value_list(args, single, multiple):
+    """Lowercased filter values from `?single=x` or `?multiple=x,y`."""
+    if args.get(single):
+        return (args[single].lower(),)
+    if args.get(multiple):
+        return tuple(v.strip().lower() for v in args[multiple].split(","))
+    return ()
+
+
+@dataclass
+class QueryResult:
+    posts: list
+    total: int
+    query: PostQuery
+    next_cursor: str | None = None
+    facets: dict | None = None
+
+    def to_dict(self):
+        result = {
+            "page": self.query.page,
+            "limit": self.query.limit,
+            "total_posts": self.total,
+            "posts": self.posts,
+        }
+        if self.next_cursor:
+            result["next_cursor"] = self.next_cursor
+        if self.facets is not None:
+            result["facets"] = self.facets
+        return result
+
+
+def load():
+    """Returns all posts, raising EngineError if the data file is corrupted."""
+    try:
+        return store.load()
+    except json.JSONDecodeError:
+        raise EngineError("Server data is corrupted. Please contact support.", 500)
+
+
+def _refresh():
+    try:
+        store.refresh()
+    except json.JSONDecodeError:
+        raise EngineError("Server data is corrupted. Please contact support.", 500)
+
+
+def _parts():
+    """Current posts, one list per shard."""
+    with store.lock:
+        _refresh()
+        return store.parts()
+
+
+def _sort_key(sort_field):
+    def key(post):
+        value = post.get(sort_field, "")
+        return (value.lower() if isinstance(value, str) else value), post.get("id", 0)
+    return key
+
+
+def _encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    try:
+        return tuple(json.loads(base64.urlsafe_b64decode(cursor.encode())))
+    except (ValueError, binascii.Error):
+        raise EngineError("Invalid cursor")
+
+
+def _project(post, fields):
+    if fields is None:
+        return post
+    return {field: post[field] for field in fields if field in post}
+
+
+def run_query(query, posts=None):
+    """Filters, sorts, paginates and projects posts according to `query`."""
+    if posts is None and (query.categories or query.authors or query.facets):
+        try:
+            with metrics.span("facets"):
+                selected = facet_index.select(query.categories, query.authors, query.facets)
+        except json.JSONDecodeError:
+            raise EngineError("Server data is corrupted. Please contact support.", 500)
+        if selected is not None:
+            matching, facets = selected
+            with metrics.span("query"):
+                return _run_query(query, [matching], facets)
+    parts = _parts() if posts is None else [posts]
+    with metrics.span("query"):
+        return _run_query(query, parts)
+
+
+def _run_query(query, parts, facets=None):
+    """Runs `query` over `parts`; given `facets`, the parts are already filtered (by the bitmaps)."""
+    descending = bool(query.sort) and query.direction == "desc"
+    if query.sort:
+        key = _sort_key(query.sort)
+    else:
+        def key(post):
+            return (post.get("id", 0),)
+
+    def select(posts):
+        if facets is None and (query.categories or query.authors):
+            filtered = [p for p in posts
+                        if (not query.categories or p["category"].lower() in query.categories)
+                        and (not query.authors or p.get("author", "").lower() in query.authors)]
+        else:
+            filtered = list(posts)
+        if query.sort or len(parts) > 1:  # a single list keeps its storage order
+            filtered.sort(key=key, reverse=descending)
+        return filtered
+
+    selected = scatter(select, parts)
+    total = sum(len(posts) for posts in selected)
+    if query.facets and facets is None:
+        facets = count_facets(chain.from_iterable(selected), query.facets)
+    ordered = iter(selected[0]) if len(selected) == 1 else heapq.merge(*selected, key=key, reverse=descending)
+
+    if query.cursor:
+        after = _decode_cursor(query.cursor)
+        ordered = dropwhile(lambda post: not (key(post) < after if descending else key(post) > after), ordered)
+    else:
+        ordered = islice(ordered, (query.page - 1) * query.limit, None)
+    try:
+        page = list(islice(ordered, query.limit + 1))
+    except TypeError:  # cursor from a different sort field
+        raise EngineError("Invalid cursor")
+
+    next_cursor = None
+    if len(page) > query.limit:
+        page = page[:query.limit]
+        next_cursor = _encode_cursor(list(key(page[-1])))
+    return QueryResult([_project(p, query.fields) for p in page], total, query, next_cursor,
+                       facets if query.facets else None)
+
+
+def search_posts(text, posts=None):
+    """Returns posts whose title, content or author contain `text` (case-insensitive)."""
+    text = text.strip().lower()
+    if not text:
+        raise EngineError("Please provide a search term using '?q=your_query'")
+    parts = _parts() if posts is None else [posts]
+
+    def matches(posts):
+        return [
+            post for post in posts
+            if text in post.get("title", "").lower()
+            or text in post.get("content", "").lower()
+            or text in post.get("author", "").lower()
+        ]
+
+    with metrics.span("search"):
+        found = scatter(matches, parts)
+        # 👇 All matches are returned, so merge the id-ordered runs with one timsort instead of heapq
+        results = found[0] if len(found) == 1 else sorted(chain.from_iterable(found), key=lambda post: post["id"])
+    if not results:
+        raise EngineError(f"No posts found matching '{text}'", 404)
+    return results
+
+
+def top_posts(n=10, category=None, by="likes"):
+    """
+    Returns the n most liked (or trending) posts, optionally within one category.
+    Trending posts carry their current decayed like count as "trending".
+    """
+    try:
+        n = int(n)
+    except (TypeError, ValueError):
+        raise EngineError("'n' must be an integer")
+    if not 1 <= n <= MAX_TOP:
+        raise EngineError(f"'n' must be between 1 and {MAX_TOP}")
+    if by not in RANKINGS:
+        raise EngineError(f"Invalid ranking. Use one of: {', '.join(RANKINGS)}")
+    try:
+        with metrics.span("top"):
+            ranked = top_index.top(n, category, by)
+    except json.JSONDecodeError:
+        raise EngineError("Server data is corrupted. Please contact support.", 500)
+    if by == "trending":
+        posts = [{**post, "trending": round(score, 3)} for post, score in ranked]
+    else:
+        posts = [post for post, _ in ranked]
+    return {"by": by, "category": category, "posts": posts}
+
+
+_category_counts = (None, Counter())  # (store version, counts), refreshed in the background
+
+
+def count_categories(posts):
+    """Returns a Counter of posts per category."""
+    counts = Counter()
+    for post in posts:
+        category = post.get("category")
+        if isinstance(category, list):
+            counts.update(category)
+        elif isinstance(category, str) and category:
+            counts[category] += 1
+    return counts
+
+
+def category_counts():
+    """Posts per category for the current posts, from the background-maintained counts when fresh."""
+    global _category_counts
+    with store.lock:
+        _refresh()
+        version = store.version
+        cached_version, counts = _category_counts
+        if cached_version == version:
+            return counts
+        # 👇 Only copy the posts out when the counts are stale
+        posts = load()
+    counts = count_categories(posts)
+    _category_counts = (version, counts)
+    return counts
+
+
+def list_categories(posts=None):
+    """Returns a unique sorted list of all categories in blog posts."""
+    counts = category_counts() if posts is None else count_categories(posts)
+    return sorted(counts)
+
+
+def changes_since(since=None):
+    """
+    Returns what changed after version `since`, for clients keeping a local copy.
+
+    Normally {"version", "reset": False, "changes": [...]}, where every change is
+    {"op": "upsert", "version", "post"} or {"op": "delete", "version", "id"}, oldest
+    first. Without `since`, or when the change log no longer reaches back that far,
+    returns {"version", "reset": True, "posts": [...]} so the client starts over.
+    """
+    if since is not None:
+        try:
+            since = int(since)
+        except (TypeError, ValueError):
+            raise EngineError("'since' must be an integer version")
+        try:
+            with metrics.span("changes"):
+                version, changes = store.changes_since(since)
+        except json.JSONDecodeError:
+            raise EngineError("Server data is corrupted. Please contact support.", 500)
+        if changes is not None:
+            return {
+                "version": version,
+                "reset": False,
+                "changes": [
+                    {"op": "delete", "version": changed_at, "id": post_id} if deleted
+                    else {"op": "upsert", "version": changed_at, "post": post}
+                    for post_id, post, changed_at, deleted in changes
+                ],
+            }
+    with store.lock:
+        posts = load()
+        return {"version": store.version, "reset": True, "posts": posts}
+
+
+def _today():
+    return datetime.now().strftime("%B %d, %Y")
+
+
+def _get(post_id):
+    """Returns the current post with this id. Call under store.lock."""
+    _refresh()
+    post = store.get(post_id)
+    if post is None:
+        raise EngineError(f"Post with ID {post_id} not found", 404)
+    return post
+
+
+# Mutations hold the store lock for the whole read-modify-write, and replace
+# post dicts instead of editing them, so concurrent readers never see a half edit.
+# Each one writes a single post, so only that post's shard file is rewritten.
+# Once it is written, the rest (change feed fan-out, top-N index, category counts)
+# is recorded, queued on the background task queue after the lock is released
+# (a full queue blocks the submitter, which must not hold locks the tasks need),
+# and the request returns.
+
+_followups = deque()  # (event type, data, version, categories changed) in version order
+_followups_lock = threading.Lock()
+
+
+def _after_write(event_type, data, categories_changed=False):
+    """Records the follow-up work of a mutation. Call under store.lock, right after the store write."""
+    _followups.append((event_type, data, store.version, categories_changed))
+
+
+def _flush_followups():
+    """Queues the recorded follow-up work, in version order. Call after releasing store.lock."""
+    with _followups_lock:
+        while _followups:
+            event_type, data, version, categories_changed = _followups.popleft()
+            tasks.submit("changefeed.publish", feed.publish, event_type, data, version, key="changefeed")
+            tasks.submit_once("ranking.sync", top_index.sync, key="ranking")
+            if categories_changed:
+                tasks.submit_once("categories.count", category_counts, key="categories")
+
+
+def create_post(data, author):
+    """Validates `data` and stores a new post by `author`. Returns the post."""
+    error = validate_post_data(data)
+    if error:
+        raise EngineError(error["error"])
+    with store.lock:
+        _refresh()
+        new_post = {
+            "id": store.next_id(),
+            "author": author,
+            "title": data["title"],
+            "content": data["content"],
+            "category": data["category"],
+            "date": _today(),
+            "likes": 0
+        }
+        store.put(new_post)
+        _after_write("post.created", new_post, categories_changed=True)
+    _flush_followups()
+    return new_post
+
+
+def update_post(post_id, data, user):
+    """Updates title, content and category of a post owned by `user`. Returns the post."""
+    with store.lock:
+        post = _get(post_id)
+        if post["author"] != user:
+            raise EngineError("Unauthorized to edit this post", 403)
+        error = validate_post_data(data)
+        if error:
+            raise EngineError(error["error"])
+        updated = {
+            **post,
+            "title": data["title"],
+            "content": data["content"],
+            "category": data["category"],
+            "updated": _today()
+        }
+        store.put(updated)
+        _after_write("post.updated", {key: updated[key] for key in ("id", "title", "content", "category", "updated")},
+                     categories_changed=post["category"] != data["category"])
+    _flush_followups()
+    return updated
+
+
+def delete_post(post_id, user):
+    """Deletes a post owned by `user`. Returns the deleted post."""
+    with store.lock:
+        post = _get(post_id)
+        if post["author"] != user:
+            raise EngineError("Unauthorized to delete this post", 403)
+        store.delete(post_id)
+        _after_write("post.deleted", {"id": post_id}, categories_changed=True)
+    _flush_followups()
+    return post
+
+
+def like_post(post_id):
+    """Increments the like count of a post. Returns the updated post."""
+    with store.lock:
+        post = _get(post_id)
+        liked = {**post, "likes": post.get("likes", 0) + 1}
+        store.put(liked)
+        _after_write("post.liked", {"id": post_id, "likes": liked["likes"]})
+    _flush_followups()
+    return liked
+
+
+def add_comment(post_id, data):
+    """Appends a comment to a post. Returns the comment."""
+    if not data or not data.get("text"):
+        raise EngineError("Comment text required")
+    comment = {
+        "author": data.get("author", "Anonymous"),
+        "text": data["text"],
+        "date": _today()
+    }
+    with store.lock:
+        post = _get(post_id)
+        store.put({**post, "comments": post.get("comments", []) + [comment]})
+        _after_write("comment.added", {"post_id": post_id, "comment": comment})
+    _flush_followups()
+    return comment
+
+
+def apply_replicated(payload):
+    """
+    Applies a /posts/changes payload from the primary to this (replica) store,
+    keeping the primary's version. Returns that version.
+    """
+    with store.lock:
+        version = _apply_replicated(payload)
+    _flush_followups()
+    return version
+
+
+def _replicated_events(old, post):
+    """
+    The events the primary published for a replicated upsert, as
+    [(event type, data, categories changed)]: likes and new comments are told
+    apart from other edits, so replicas stream the same events as the primary.
+    """
+    if old is None:
+        return [("post.created", post, True)]
+    changed_keys = {key for key in old.keys() | post.keys() if old.get(key) != post.get(key)}
+    old_comments, comments = old.get("comments") or [], post.get("comments") or []
+    if changed_keys == {"likes"}:
+        return [("post.liked", {"id": post["id"], "likes": post["likes"]}, False)]
+    if changed_keys == {"comments"} and comments[:len(old_comments)] == old_comments:
+        return [("comment.added", {"post_id": post["id"], "comment": comment}, False)
+                for comment in comments[len(old_comments):]]
+    return [("post.updated", post, True)]
+
+
+def _apply_replicated(payload):
+    """Applies a replicated payload. Call under store.lock."""
+    posts = load()
+    if payload["reset"]:
+        store.save(payload["posts"], version=payload["version"])
+        _after_write("resync", {}, categories_changed=True)
+        return payload["version"]
+    if not payload["changes"]:
+        return store.version
+    by_id = {post["id"]: post for post in posts}
+    changed, events = [], []
+    for change in payload["changes"]:
+        if change["op"] == "delete":
+            by_id.pop(change["id"], None)
+            changed.append((change["id"], True))
+            events.append(("post.deleted", {"id": change["id"]}, True))
+        else:
+            post = change["post"]
+            events.extend(_replicated_events(by_id.get(post["id"]), post))
+            by_id[post["id"]] = post
+            changed.append((post["id"], False))
+    store.save(list(by_id.values()), changed, version=payload["version"])
+    for event_type, data, categories_changed in events:
+        _after_write(event_type, data, categories_changed=categories_changed)
+    return payload["version"]
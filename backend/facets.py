@@ -0,0 +1,171 @@
+"""
+Bitmap indexes for filtering by category and author, and for facet counts.
+
+Every category and every author has a bitset of the posts it covers, kept in
+a plain Python int where bit n stands for the post with id n (ids come from
+next_id(), so they are dense). A filter becomes a handful of big-int
+operations instead of a check per post:
+
+    (category["science"] | category["space"]) & (author["martin"] | author["ron"])
+
+and the facet count of a category within any result is one
+`(result & bits[category]).bit_count()`. The matching posts are read from the
+store in id order by scanning the set bits. Like the top-N index, the bitmaps
+follow the store's change log and only rebuild when the log has been reset.
+"""
+import threading
+from storage import store
+
+MAX_BIT = 1 << 24  # ids above this (or not ints) would make huge bitsets: filter per post instead
+
+
+def _values(value):
+    """{lowercased: as written} for a string or a list of strings."""
+    if isinstance(value, str):
+        return {value.lower(): value} if value else {}
+    if isinstance(value, list):
+        return {v.lower(): v for v in value if isinstance(v, str) and v}
+    return {}
+
+
+def _categories(post):
+    return _values(post.get("category"))
+
+
+def _author(post):
+    return _values(post.get("author"))
+
+
+def count_facets(posts, facets):
+    """Facet counts by scanning `posts`, for when the bitmaps can't be used."""
+    counts = {facet: {} for facet in facets}
+    for post in posts:
+        for facet in facets:
+            values = _categories(post) if facet == "category" else _author(post)
+            for label in values.values():
+                counts[facet][label] = counts[facet].get(label, 0) + 1
+    return counts
+
+
+def _bitset(ids):
+    """An int with the bits at `ids` set."""
+    data = bytearray((max(ids, default=0) >> 3) + 1)
+    for position in ids:
+        data[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(data, "little")
+
+
+def members(bits):
+    """The positions of the set bits, lowest first."""
+    # 👇 str.find skips runs of zeros in C instead of testing every bit in Python
+    digits = bin(bits)[:1:-1]  # lowest bit first
+    position = digits.find("1")
+    while position >= 0:
+        yield position
+        position = digits.find("1", position + 1)
+
+
+class FacetIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.rebuild([])
+
+    def rebuild(self, posts):
+        self.bits = {"category": {}, "author": {}}    # facet -> lowercased value -> bitset
+        self.labels = {"category": {}, "author": {}}  # facet -> lowercased value -> display name
+        self.entries = {}  # post id -> {facet: lowercased values}
+        self.oversized = set()  # ids that can't be bit positions
+        positions = {"category": {}, "author": {}}
+        for post in posts:
+            entry = self._entry(post)
+            for facet, keys in (entry or {}).items():
+                for key in keys:
+                    positions[facet].setdefault(key, []).append(post["id"])
+        # 👇 Setting bits one by one would copy the growing int for every post
+        for facet, values in positions.items():
+            for key, ids in values.items():
+                self.bits[facet][key] = _bitset(ids)
+        self.all = _bitset(self.entries)
+
+    def _entry(self, post):
+        """Records the post's facet values and labels, returns them (None if it can't be indexed)."""
+        post_id = post["id"]
+        if not isinstance(post_id, int) or not 0 <= post_id < MAX_BIT:
+            self.oversized.add(post_id)
+            return None
+        categories, author = _categories(post), _author(post)
+        self.labels["category"].update(categories)
+        self.labels["author"].update(author)
+        entry = self.entries[post_id] = {"category": tuple(categories), "author": tuple(author)}
+        return entry
+
+    def _insert(self, post):
+        entry = self._entry(post)
+        if entry is None:
+            return
+        bit = 1 << post["id"]
+        self.all |= bit
+        for facet, keys in entry.items():
+            for key in keys:
+                self.bits[facet][key] = self.bits[facet].get(key, 0) | bit
+
+    def _remove(self, post_id):
+        self.oversized.discard(post_id)
+        entry = self.entries.pop(post_id, None)
+        if entry is None:
+            return
+        bit = 1 << post_id
+        self.all &= ~bit
+        for facet, keys in entry.items():
+            for key in keys:
+                remaining = self.bits[facet][key] & ~bit
+                if remaining:
+                    self.bits[facet][key] = remaining
+                else:
+                    del self.bits[facet][key], self.labels[facet][key]
+
+    def sync(self):
+        """Brings the bitmaps up to the store's current version."""
+        version, changes = store.changes_since(self.version)
+        if changes is None:
+            self.rebuild(store.load())
+        else:
+            for post_id, post, _, deleted in changes:
+                self._remove(post_id)
+                if not deleted and post is not None:
+                    self._insert(post)
+        self.version = version
+
+    def select(self, categories=(), authors=(), facets=()):
+        """
+        Posts in any of `categories` and by any of `authors` (empty = no
+        restriction), in id order, plus {facet: {name: count}} within them.
+
+        Returns:
+            tuple[list, dict] | None: None if some ids don't fit a bitset.
+        """
+        with store.lock, self.lock:
+            self.sync()
+            if self.oversized:
+                return None
+            result = self.all
+            for facet, wanted in (("category", categories), ("author", authors)):
+                if wanted:
+                    bits = self.bits[facet]
+                    any_of = 0
+                    for key in wanted:
+                        any_of |= bits.get(key, 0)
+                    result &= any_of
+            counts = {
+                facet: {self.labels[facet][key]: count for key, bits in self.bits[facet].items()
+                        if (count := (result & bits).bit_count())}
+                for facet in facets
+            }
+        # 👇 Outside the locks: reading the matches is O(matches) and store.lock blocks every read and write.
+        #    A post written meanwhile comes back in its new state, a deleted one is left out.
+        posts = [store.get(post_id) for post_id in members(result)]
+        return [post for post in posts if post is not None], counts
+
+
+facet_index = FacetIndex()
@@ -0,0 +1,39 @@
+# gunicorn.conf.py — production profile: gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:5021")
+
+# 👇 Store and Swagger spec are built once in the master and shared copy-on-write
+preload_app = True
+reload = False
+
+# 👇 Every worker has its own in-memory store. A primary runs a single worker: several would
+# rewrite the same posts file without coordination (duplicate ids, lost posts) and split the
+# change log and change feed. Replicas (REPLICA_OF) keep their posts in memory and scale out;
+# add replicas to scale reads.
+replica = bool(os.environ.get("REPLICA_OF"))
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1 if replica else 1))
+threads = int(os.environ.get("THREADS", 16))
+keepalive = 5
+timeout = 30
+graceful_timeout = 30
+# 👇 Replicas recycle workers now and then to keep memory in check. A primary's only worker
+# holds the sessions, rate limits and change log, so restarting it would log everyone out,
+# force every client and replica into a full resync and leave nothing serving meanwhile.
+max_requests = 10000 if replica else 0
+max_requests_jitter = 1000 if replica else 0
+accesslog = "-"
+
+
+def worker_exit(server, worker):
+    # 👇 Finish queued background work (change feed, counts, compaction) before the worker goes
+    from tasks import tasks
+    tasks.drain()
+
+
+def on_starting(server):
+    if server.cfg.workers > 1 and not replica:
+        server.log.warning("%d workers on a primary: they will overwrite each other's posts. "
+                           "Use WEB_CONCURRENCY=1 and scale reads with replicas.", server.cfg.workers)
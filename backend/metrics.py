@@ -0,0 +1,175 @@
+"""
+In-process metrics, exposed in Prometheus text format on /metrics.
+
+- Request latency per route (before_request / after_request hooks).
+- Stage latency via `with metrics.span("storage.load"):` around hot-path work.
+- Counters for storage bytes and cache hits / misses.
+- Gauges read from a callback at scrape time (`metrics.gauge("task_queue_depth", fn)`).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from flask import g, request
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+DESCRIPTIONS = {
+    "http_request_duration_seconds": ("histogram", "Request latency per route"),
+    "http_requests_total": ("counter", "Requests per route and status"),
+    "stage_duration_seconds": ("histogram", "Latency of hot-path stages (storage, serialize, auth, ...)"),
+    "storage_bytes_read_total": ("counter", "Bytes parsed from the posts file"),
+    "storage_bytes_written_total": ("counter", "Bytes written to the posts file"),
+    "cache_requests_total": ("counter", "Cache lookups by cache and result"),
+    "cache_hit_ratio": ("gauge", "Share of cache lookups that were hits"),
+    "task_queue_depth": ("gauge", "Background tasks waiting to run"),
+    "tasks_submitted_total": ("counter", "Background tasks queued"),
+    "tasks_completed_total": ("counter", "Background tasks finished, by result"),
+    "tasks_backpressure_total": ("counter", "Background task submits that had to wait for room in the queue"),
+    "tasks_coalesced_total": ("counter", "Background tasks dropped because the same task was already waiting"),
+    "task_wait_seconds": ("histogram", "Time background tasks spent queued"),
+    "task_duration_seconds": ("histogram", "Run time of background tasks"),
+    "response_bytes_uncompressed_total": ("counter", "Size of compressed responses before compression"),
+    "response_bytes_compressed_total": ("counter", "Size of compressed responses on the wire"),
+    "replication_changes_total": ("counter", "Post changes applied from the primary"),
+    "replication_errors_total": ("counter", "Failed syncs with the primary"),
+    "replication_lag_seconds": ("histogram", "Time from a write on the primary to it being applied here"),
+    "singleflight_leaders_total": ("counter", "Reads computed for themselves and any identical concurrent reads"),
+    "singleflight_coalesced_total": ("counter", "Reads served by an identical read already in flight"),
+    "singleflight_timeouts_total": ("counter", "Reads that stopped waiting for an identical read and computed their own"),
+}
+
+
+class Histogram:
+    """Cumulative-bucket histogram as Prometheus expects it."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}  # (name, labels) -> Histogram
+        self.counters = {}    # (name, labels) -> number
+        self.gauges = {}      # (name, labels) -> callable returning the current value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def gauge(self, name, read, **labels):
+        """Registers a gauge whose value is read by calling `read()` on every scrape."""
+        with self.lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = read
+
+    def cache_result(self, cache, hit):
+        self.inc("cache_requests_total", cache=cache, result="hit" if hit else "miss")
+
+    @contextmanager
+    def span(self, stage):
+        """Times the block as one stage of the current request."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_duration_seconds", time.perf_counter() - start, stage=stage)
+
+    def init_app(self, app):
+        """
+        Registers the request timing hooks.
+
+        Call it right after limiter.init_app(app): the clock is started before
+        every other hook, and the time up to this point is recorded as the
+        "limiter" stage.
+        """
+        app.before_request_funcs.setdefault(None, []).insert(0, self._start_request)
+        app.before_request(self._limiter_done)
+        app.after_request(self._end_request)
+
+    def _start_request(self):
+        g.request_start = time.perf_counter()
+
+    def _limiter_done(self):
+        self.observe("stage_duration_seconds", time.perf_counter() - g.request_start, stage="limiter")
+
+    def _end_request(self, response):
+        start = g.get("request_start")
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            self.observe("http_request_duration_seconds", time.perf_counter() - start,
+                         route=route, method=request.method)
+            self.inc("http_requests_total", route=route, method=request.method, status=response.status_code)
+            if response.status_code == 304:
+                self.cache_result("etag", True)
+        return response
+
+    def render(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        lookups = {}
+        for (name, labels), value in counters.items():
+            if name == "cache_requests_total":
+                label_map = dict(labels)
+                hits, total = lookups.get(label_map["cache"], (0, 0))
+                lookups[label_map["cache"]] = (hits + (value if label_map["result"] == "hit" else 0), total + value)
+
+        lines = []
+        seen = set()
+
+        def header(name):
+            if name not in seen:
+                seen.add(name)
+                kind, text = DESCRIPTIONS.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), (counts, total_sum, count, buckets) in sorted(histograms.items()):
+            header(name)
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{_series(name + '_bucket', labels + (('le', le),))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {total_sum}")
+            lines.append(f"{_series(name + '_count', labels)} {count}")
+        for (name, labels), value in sorted(counters.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            header(name)
+            lines.append(f"{_series(name, labels)} {value}")
+        for cache, (hits, total) in sorted(lookups.items()):
+            header("cache_hit_ratio")
+            lines.append(f'cache_hit_ratio{{cache="{cache}"}} {hits / total if total else 0}')
+        for (name, labels), read in sorted(gauges.items(), key=lambda item: (item[0][0], str(item[0][1]))):
+            header(name)
+            lines.append(f"{_series(name, labels)} {read()}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
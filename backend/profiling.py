@@ -0,0 +1,98 @@
+"""
+Opt-in profiling of single requests.
+
+With PROFILING_ENABLED set, an admin (see ADMIN_USERS) can profile one request
+by sending the header `X-Profile: 1` or the query parameter `profile=1`.
+The request runs under cProfile, the stats are stored in PROFILE_DIR and the
+response carries an `X-Profile-Id` header. Results are downloadable from
+/api/v2/admin/profiles/<id> (pstats file, or ?format=text for a summary).
+
+When PROFILING_ENABLED is off nothing is registered: no hooks, no routes.
+"""
+import cProfile
+import io
+import os
+import pstats
+import uuid
+from flask import Blueprint, current_app, g, jsonify, request, send_file
+from auth import current_user, token_required
+
+profiling = Blueprint("profiling", __name__, url_prefix="/api/v2/admin/profiles")
+
+
+def is_admin(user):
+    return user is not None and user in current_app.config.get("ADMIN_USERS", ())
+
+
+def init_profiling(app):
+    """Registers the profiling hooks and download routes if PROFILING_ENABLED is set."""
+    if not app.config.get("PROFILING_ENABLED"):
+        return
+    os.makedirs(app.config["PROFILE_DIR"], exist_ok=True)
+    app.before_request(_start_profile)
+    app.after_request(_stop_profile)
+    app.teardown_request(_discard_profile)
+    app.register_blueprint(profiling)
+
+
+def _wants_profile():
+    return request.headers.get("X-Profile") == "1" or request.args.get("profile") == "1"
+
+
+def _start_profile():
+    if _wants_profile() and is_admin(current_user()):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+def _stop_profile(response):
+    profiler = g.pop("profiler", None)
+    if profiler is None:
+        return response
+    profiler.disable()
+    profile_id = uuid.uuid4().hex
+    profiler.dump_stats(os.path.join(current_app.config["PROFILE_DIR"], f"{profile_id}.pstats"))
+    response.headers["X-Profile-Id"] = profile_id
+    return response
+
+
+def _discard_profile(error=None):
+    profiler = g.pop("profiler", None)  # still set only if the request failed before after_request
+    if profiler is not None:
+        profiler.disable()
+
+
+def _profile_path(profile_id):
+    if not all(c in "0123456789abcdef" for c in profile_id):
+        return None
+    path = os.path.join(current_app.config["PROFILE_DIR"], f"{profile_id}.pstats")
+    return path if os.path.exists(path) else None
+
+
+@profiling.route("", methods=["GET"])
+@token_required
+def list_profiles(user):
+    """Lists stored profiles, newest first."""
+    if not is_admin(user):
+        return jsonify({"error": "Admins only"}), 403
+    directory = current_app.config["PROFILE_DIR"]
+    files = sorted((f for f in os.listdir(directory) if f.endswith(".pstats")),
+                   key=lambda f: os.path.getmtime(os.path.join(directory, f)), reverse=True)
+    return jsonify([f[:-len(".pstats")] for f in files])
+
+
+@profiling.route("/<profile_id>", methods=["GET"])
+@token_required
+def download_profile(user, profile_id):
+    """Returns a stored profile as a pstats file, or as text with ?format=text."""
+    if not is_admin(user):
+        return jsonify({"error": "Admins only"}), 403
+    path = _profile_path(profile_id)
+    if path is None:
+        return jsonify({"error": f"Profile {profile_id} not found"}), 404
+    if request.args.get("format") == "text":
+        output = io.StringIO()
+        pstats.Stats(path, stream=output).sort_stats("cumulative").print_stats(40)
+        return output.getvalue(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+    return send_file(os.path.abspath(path), mimetype="application/octet-stream",
+                     as_attachment=True, download_name=f"{profile_id}.pstats")
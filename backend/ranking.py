@@ -0,0 +1,123 @@
+"""
+Top-N index: the most liked and the trending posts, overall and per category.
+
+Each ranking is a list kept sorted with bisect, one per category plus one for
+all posts ("" key), so a top-N request is a slice. The index follows the
+store's change log: `sync()` applies the posts changed since the last sync
+(a bisect + list shift per post) and only rebuilds when the log has been reset.
+
+Trending is an exponentially decayed like count with a half-life of
+TRENDING_HALF_LIFE. It is kept as log2(sum of 2^(t / half_life)) over the
+likes ("forward decay"), which only grows, so the order never has to be
+recomputed as time passes: the decayed score now is 2^(key - now / half_life).
+Likes that predate the index are dated at the post's date.
+"""
+import math
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime
+from functools import lru_cache
+from storage import store
+
+TRENDING_HALF_LIFE = 24 * 3600  # seconds
+RANKINGS = ("likes", "trending")
+
+
+def _categories(post):
+    category = post.get("category")
+    if isinstance(category, list):
+        return ("",) + tuple({c.lower() for c in category})
+    return ("", category.lower()) if isinstance(category, str) and category else ("",)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(text):
+    return datetime.strptime(text, "%B %d, %Y").timestamp()
+
+
+def _post_time(post):
+    for field in ("updated", "date"):
+        try:
+            return _parse_date(post[field])
+        except (KeyError, TypeError, ValueError):
+            pass
+    return 0.0
+
+
+def _add_likes(key, likes, at):
+    """Adds `likes` likes made at time `at` (seconds) to a forward-decay key."""
+    if likes <= 0:
+        return key
+    added = math.log2(likes) + at / TRENDING_HALF_LIFE
+    if key == -math.inf:
+        return added
+    high, low = max(key, added), min(key, added)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+class TopIndex:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = 0
+        self.entries = {}   # post id -> (categories, likes, trending key)
+        self.rankings = {}  # (ranking, category) -> sorted [(-score, post id)]
+
+    def _insert(self, post_id, categories, likes, trend):
+        self.entries[post_id] = (categories, likes, trend)
+        for category in categories:
+            insort(self.rankings.setdefault(("likes", category), []), (-likes, post_id))
+            insort(self.rankings.setdefault(("trending", category), []), (-trend, post_id))
+
+    def _remove(self, post_id):
+        categories, likes, trend = self.entries.pop(post_id)
+        for category in categories:
+            for name, score in (("likes", likes), ("trending", trend)):
+                ranking = self.rankings[(name, category)]
+                del ranking[bisect_left(ranking, (-score, post_id))]
+        return likes, trend
+
+    def rebuild(self, posts):
+        self.entries = {}
+        self.rankings = {}
+        for post in posts:
+            likes = post.get("likes", 0)
+            trend = _add_likes(-math.inf, likes, _post_time(post))
+            categories = _categories(post)
+            self.entries[post["id"]] = (categories, likes, trend)
+            for category in categories:
+                self.rankings.setdefault(("likes", category), []).append((-likes, post["id"]))
+                self.rankings.setdefault(("trending", category), []).append((-trend, post["id"]))
+        for ranking in self.rankings.values():
+            ranking.sort()
+
+    def sync(self):
+        """Brings the index up to the store's current version."""
+        with store.lock, self.lock:  # same order as the write path and FacetIndex
+            version, changes = store.changes_since(self.version)
+            if changes is None:
+                self.rebuild(store.load())
+            else:
+                for post_id, post, changed_at, deleted in changes:
+                    likes, trend = self._remove(post_id) if post_id in self.entries else (0, -math.inf)
+                    if not deleted and post is not None:
+                        new_likes = post.get("likes", 0)
+                        trend = _add_likes(trend, new_likes - likes, changed_at / 1e6)
+                        self._insert(post_id, _categories(post), new_likes, trend)
+            self.version = version
+
+    def top(self, n, category=None, by="likes"):
+        """Returns [(post, score), ...] for the n best posts, best first."""
+        self.sync()
+        with self.lock:
+            ranking = self.rankings.get((by, (category or "").lower()), [])[:n]
+        now = time.time() / TRENDING_HALF_LIFE
+        results = []
+        for score, post_id in ranking:
+            post = store.get(post_id)
+            if post is not None:
+                results.append((post, -score if by == "likes" else 2 ** (-score - now)))
+        return results
+
+
+top_index = TopIndex()
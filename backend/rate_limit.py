@@ -1,12 +1,161 @@
 # rate_limit.py
+import hmac
+import threading
+import time
+from functools import wraps
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-from flask import request
+from flask import current_app, request, jsonify, g
+from limits import parse
+from utils import is_revalidation
+from metrics import metrics
+
+HOT_SYNC_INTERVAL = 5  # seconds between pushing local token bucket hits to the shared limiter storage
+
 
 def get_token_or_ip():
-    return request.headers.get("Authorization") or get_remote_address()
+    return request.headers.get("Authorization") or replicated_client() or get_remote_address()
+
+
+def replicated_client():
+    """Client address of a write forwarded by one of our replicas (see replication.py)."""
+    secret = current_app.config.get("REPLICATION_SECRET")
+    if secret and hmac.compare_digest(request.headers.get("X-Replication-Secret", ""), secret):
+        return request.headers.get("X-Forwarded-For")
+    return None
+
+
+def is_cheap_response(response):
+    """304s and cache hits cost next to nothing, so they shouldn't eat into anybody's limit."""
+    return response.status_code == 304 or g.get("cache_hit", False)
+
+
+def deduct_when_expensive(response):
+    return not is_cheap_response(response)
+
 
 limiter = Limiter(
     key_func=get_token_or_ip,         # avoids blocking of users sharing an IP-address (f.e. in Cafés)
-    default_limits=["100 per hour"]   # if logged in - token is used, logged out - ip is used
-)
\ No newline at end of file
+    default_limits=["100 per hour"],  # if logged in - token is used, logged out - ip is used
+    default_limits_deduct_when=deduct_when_expensive
+)
+
+
+@limiter.request_filter
+def skip_revalidations():
+    """Fast path: a GET the client already holds becomes a 304, no limiter bookkeeping needed."""
+    return is_revalidation()
+
+
+class TokenBucket:
+    """Simple token bucket: `capacity` tokens, refilled continuously over `period` seconds."""
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def consume(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def is_full(self, now):
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+    def refund(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class HotLimit:
+    """
+    In-process rate limit for hot GET endpoints.
+
+    Every request is checked against a local token bucket (no storage round trip).
+    Consumed tokens are pushed to the shared limiter storage every HOT_SYNC_INTERVAL
+    seconds, and a key that is over its shared limit (f.e. through other workers)
+    gets its local bucket drained.
+    """
+
+    def __init__(self, limit_string):
+        self.limit_string = limit_string
+        self.item = parse(limit_string)
+        self.buckets = {}
+        self.pending = {}
+        self.lock = threading.Lock()
+        self.last_sync = time.monotonic()
+
+    def acquire(self, key):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = TokenBucket(self.item.amount, self.item.get_expiry())
+            allowed = bucket.consume(now)
+            if allowed:
+                self.pending[key] = self.pending.get(key, 0) + 1
+            due = now - self.last_sync >= HOT_SYNC_INTERVAL
+            if due:
+                self.last_sync = now
+                pending, self.pending = self.pending, {}
+        if due:
+            self.sync(pending)
+        return allowed
+
+    def release(self, key):
+        """Gives back the token of a request that turned out to be cheap."""
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.refund()
+            if self.pending.get(key):
+                self.pending[key] -= 1
+
+    def sync(self, pending):
+        strategy = limiter.limiter
+        for key, hits in pending.items():
+            if hits:
+                strategy.hit(self.item, "hot", self.limit_string, key, cost=hits)
+            if not strategy.test(self.item, "hot", self.limit_string, key):
+                with self.lock:
+                    if key in self.buckets:
+                        self.buckets[key].tokens = 0
+        now = time.monotonic()
+        with self.lock:  # forget idle keys so the bucket table doesn't grow forever
+            idle = [key for key, bucket in self.buckets.items()
+                    if bucket.is_full(now) and key not in self.pending]
+            for key in idle:
+                del self.buckets[key]
+
+
+def hot_limit(limit_string):
+    """
+    Decorator for hot GET endpoints: rate limits with an in-process token bucket
+    instead of a storage hit per request. Combine with @limiter.exempt.
+    """
+    hot = HotLimit(limit_string)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if is_revalidation() or not limiter.enabled:
+                return f(*args, **kwargs)
+            key = get_token_or_ip()
+            with metrics.span("limiter.hot"):
+                allowed = hot.acquire(key)
+            if not allowed:
+                response = jsonify({"error": f"Rate limit exceeded: {limit_string}"})
+                response.status_code = 429
+                response.headers["Retry-After"] = str(max(1, int(hot.item.get_expiry() / hot.item.amount)))
+                return response
+            response = f(*args, **kwargs)
+            status = response[1] if isinstance(response, tuple) else getattr(response, "status_code", 200)
+            if status == 304 or g.get("cache_hit", False):
+                hot.release(key)
+            return response
+        return decorated
+    return decorator
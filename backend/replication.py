@@ -0,0 +1,177 @@
+"""
+Primary / read-replica replication.
+
+One primary process owns blog_posts.json and applies every mutation. A replica
+(REPLICA_OF=<primary URL>) keeps its posts in memory only and tails the
+primary's change log:
+
+    GET /api/v2/posts/changes?since=<version>   ordered changes, or a full snapshot
+    GET /api/v2/posts/poll?since=<version>      waits for the next change (ASGI primaries)
+
+Batches are applied with the primary's version, so versions, ETags and the
+change feed line up across nodes. Without the long-poll endpoint (primary
+under gunicorn/WSGI) the replica polls every SYNC_INTERVAL.
+
+Writes sent to a replica are forwarded to the primary (REPLICA_WRITES=forward,
+the default) and the replica waits until it has caught up with the primary's
+X-Store-Version, so clients read their own writes. With REPLICA_WRITES=reject
+they get a 503 naming the primary instead.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from flask import Response, current_app, jsonify, request
+from storage import store
+from metrics import metrics
+import engine
+
+SYNC_INTERVAL = 1.0     # seconds between polls when the primary has no long-poll endpoint
+POLL_TIMEOUT = 25       # seconds per long-poll request
+RETRY_DELAY = 2.0       # seconds to wait after a failed sync
+READY_TIMEOUT = 10      # seconds a request waits for the first sync of a fresh replica
+CATCH_UP_TIMEOUT = 2.0  # seconds a forwarded write waits for the replica to see it
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+FORWARDED_HEADERS = ("Authorization", "Content-Type")
+
+log = logging.getLogger(__name__)
+
+
+class Replicator:
+    """Tails the primary's change log in a background thread."""
+
+    def __init__(self):
+        self.primary = None
+        self.version = None  # primary version we're synced to
+        self.long_poll = True
+        self.lock = threading.Lock()
+        self.caught_up = threading.Condition()
+        self.ready = threading.Event()
+        self.wakeup = threading.Event()
+        self._pid = None
+
+    def start(self, primary):
+        """Starts tailing `primary`, once per process (threads don't survive a fork)."""
+        if self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid == os.getpid():
+                return
+            self.primary = primary.rstrip("/")
+            threading.Thread(target=self._run, daemon=True, name="replicator").start()
+            self._pid = os.getpid()
+
+    def _get(self, path, timeout):
+        with urllib.request.urlopen(self.primary + path, timeout=timeout) as response:
+            return json.load(response)
+
+    def _run(self):
+        while True:
+            try:
+                self.sync()
+                self._wait()
+            except (OSError, ValueError, KeyError) as error:
+                log.warning("Replication from %s failed: %s", self.primary, error)
+                metrics.inc("replication_errors_total")
+                self.wakeup.wait(RETRY_DELAY)
+                self.wakeup.clear()
+
+    def sync(self):
+        """Fetches and applies everything the primary has after our version."""
+        query = f"?since={self.version}" if self.version is not None else ""
+        payload = self._get("/api/v2/posts/changes" + query, timeout=30)
+        with metrics.span("replication.apply"):
+            engine.apply_replicated(payload)
+        changes = payload.get("changes")
+        if changes:
+            metrics.inc("replication_changes_total", len(changes))
+            # 👇 Versions are primary timestamps (µs), so this is the write-to-visible lag
+            metrics.observe("replication_lag_seconds", max(0.0, time.time() - changes[-1]["version"] / 1e6))
+        with self.caught_up:
+            self.version = payload["version"]
+            self.caught_up.notify_all()
+        self.ready.set()
+
+    def _wait(self):
+        """Blocks until the primary has something new, or for SYNC_INTERVAL without long-poll."""
+        if self.long_poll:
+            try:
+                self._get(f"/api/v2/posts/poll?since={self.version}&timeout={POLL_TIMEOUT}", POLL_TIMEOUT + 5)
+                return
+            except urllib.error.HTTPError as error:
+                if error.code != 404:
+                    raise
+                self.long_poll = False  # WSGI primary, fall back to polling
+        self.wakeup.wait(SYNC_INTERVAL)
+        self.wakeup.clear()
+
+    def wait_for(self, version, timeout=CATCH_UP_TIMEOUT):
+        """Waits until this replica has applied the primary's `version`. Returns False on timeout."""
+        self.wakeup.set()
+        with self.caught_up:
+            return self.caught_up.wait_for(lambda: self.version is not None and self.version >= version, timeout)
+
+
+replicator = Replicator()
+
+
+def init_replication(app):
+    """
+    Primary: tags write responses with X-Store-Version.
+    Replica (REPLICA_OF set): tails the primary and forwards or rejects writes.
+    """
+    if app.config.get("REPLICA_OF"):
+        app.before_request(_replica_request)
+    else:
+        app.after_request(_tag_version)
+
+
+def start_replication(app):
+    if app.config.get("REPLICA_OF"):
+        replicator.start(app.config["REPLICA_OF"])
+
+
+def _tag_version(response):
+    if request.method in WRITE_METHODS:
+        response.headers["X-Store-Version"] = str(store.version)
+    return response
+
+
+def _replica_request():
+    config = current_app.config
+    replicator.start(config["REPLICA_OF"])
+    replicator.ready.wait(READY_TIMEOUT)
+    if request.method not in WRITE_METHODS or not request.path.startswith("/api/"):
+        return None
+    if config.get("REPLICA_WRITES", "forward") == "reject":
+        return jsonify({"error": "This server is a read-only replica", "primary": replicator.primary}), 503
+    return forward_write(config.get("REPLICATION_SECRET"))
+
+
+def forward_write(secret=None):
+    """Sends the current request to the primary and relays its answer."""
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    if secret:
+        # 👇 Lets the primary rate-limit by the real client instead of by this replica
+        headers["X-Replication-Secret"] = secret
+        headers["X-Forwarded-For"] = request.remote_addr or ""
+    forwarded = urllib.request.Request(replicator.primary + request.full_path.rstrip("?"),
+                                       data=request.get_data(), headers=headers, method=request.method)
+    try:
+        with metrics.span("replication.forward"):
+            with urllib.request.urlopen(forwarded, timeout=10) as answer:
+                status, body, answer_headers = answer.status, answer.read(), answer.headers
+    except urllib.error.HTTPError as error:
+        status, body, answer_headers = error.code, error.read(), error.headers
+    except OSError:
+        return jsonify({"error": "Primary is unavailable. Please try again later."}), 502
+
+    response = Response(body, status, content_type=answer_headers.get("Content-Type"))
+    version = answer_headers.get("X-Store-Version")
+    if version:
+        replicator.wait_for(int(version))
+        response.headers["X-Store-Version"] = version
+    return response
@@ -0,0 +1,72 @@
+"""
+Single-flight coalescing of identical concurrent reads.
+
+When a popular list or search page is requested by many clients at once (a
+cache miss, or right after a write), each request would load, filter, sort
+and serialize the same posts. With
+
+    flights.do("posts", key, compute)
+
+the first request for a key runs `compute` and every identical request that
+arrives while it runs waits for that result instead of computing its own.
+Nothing is cached beyond the flight: the next request after it lands starts a
+new one. Errors are raised in every waiting request. A follower that waits
+longer than WAIT_TIMEOUT gives up and computes on its own.
+"""
+import threading
+from metrics import metrics
+
+WAIT_TIMEOUT = 5.0  # seconds a follower waits for the leader before computing itself
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, timeout=WAIT_TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.flights = {}  # key -> _Flight in progress
+
+    def do(self, name, key, compute):
+        """
+        Returns `compute()`, shared with concurrent calls for the same key.
+
+        Args:
+            name (str): Flight name, used as the metrics label.
+            key (hashable): The normalized request; equal keys share a result.
+            compute (callable): Produces the result; its exceptions propagate.
+        """
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+
+        if not leader:
+            if flight.done.wait(self.timeout):
+                metrics.inc("singleflight_coalesced_total", flight=name)
+                if flight.error is not None:
+                    raise flight.error
+                return flight.result
+            metrics.inc("singleflight_timeouts_total", flight=name)
+            return compute()
+
+        metrics.inc("singleflight_leaders_total", flight=name)
+        try:
+            flight.result = compute()
+            return flight.result
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+
+flights = SingleFlight()
@@ -0,0 +1,515 @@
+import asyncio
+import gzip
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from metrics import metrics
+from tasks import tasks
+
+POLL_INTERVAL = 1.0  # seconds between file checks while long-poll clients are waiting
+MAX_CHANGES = 10000  # change log entries kept before compaction
+SHARD_RANGE = 1000   # consecutive ids per range when sharding by id
+SHARD_MODES = ("id", "category")
+SNAPSHOT_LEVEL = 1   # gzip level for .gz posts files: rewritten on every write, so favour speed
+
+log = logging.getLogger(__name__)
+
+
+def _post_id(post):
+    return post["id"]
+
+
+def _split(path):
+    """blog_posts.json.gz -> ("blog_posts", ".json.gz")"""
+    stem, extension = os.path.splitext(path)
+    if extension == ".gz":
+        stem, inner = os.path.splitext(stem)
+        extension = inner + extension
+    return stem, extension
+
+
+def shard_paths(path, count):
+    """blog_posts.json.gz -> blog_posts.0.json.gz, blog_posts.1.json.gz, ... (the file itself for one shard)."""
+    if count == 1 or path is None:
+        return [path] * count
+    stem, extension = _split(path)
+    return [f"{stem}.{i}{extension}" for i in range(count)]
+
+
+def layout_path(path):
+    """blog_posts.json.gz -> blog_posts.layout.json, which records the files the posts are in."""
+    return f"{_split(path)[0]}.layout.json"
+
+
+def read_posts(path):
+    """Parses a posts file, plain or gzip-compressed (.gz)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as file:
+        return json.load(file)
+
+
+def encode_posts(posts, path):
+    """Compact JSON, gzip-compressed if the path ends in .gz."""
+    data = json.dumps(posts, separators=(",", ":")).encode()
+    return gzip.compress(data, compresslevel=SNAPSHOT_LEVEL, mtime=0) if path.endswith(".gz") else data
+
+
+_pool = (None, 0, None)  # (pid, workers, executor), threads don't survive a fork
+_pool_lock = threading.Lock()
+
+
+def scatter(function, items):
+    """Returns [function(item) for item in items], run on a thread pool when there are several."""
+    global _pool
+    if len(items) == 1:
+        return [function(items[0])]
+    with _pool_lock:
+        pid, workers, executor = _pool
+        if pid != os.getpid() or workers < len(items):
+            if pid == os.getpid():
+                executor.shutdown(wait=False)  # its threads finish what they have, then exit
+            executor = ThreadPoolExecutor(max_workers=len(items), thread_name_prefix="shard")
+            _pool = (os.getpid(), len(items), executor)
+    return list(executor.map(function, items))
+
+
+class ChangeLog:
+    """
+    Per-version index of changed post ids, for "changes since version N" queries.
+
+    Entries are appended in version order, so a query is a bisect plus a walk
+    over the newer entries. `latest` holds the newest version (and whether it
+    was a delete) per post, so superseded entries are skipped. Compaction drops
+    superseded entries and, past MAX_CHANGES posts, the oldest ones; `floor` is
+    the oldest version the log can still answer for. It runs on the background
+    task queue, or inline if the log has grown to twice its size meanwhile.
+    """
+
+    def __init__(self, max_entries=MAX_CHANGES, lock=None):
+        self.max_entries = max_entries
+        self.lock = lock or threading.RLock()
+        self.versions = []
+        self.post_ids = []
+        self.latest = {}  # post id -> (version, deleted)
+        self.floor = 0
+
+    def record(self, version, post_id, deleted=False):
+        self.versions.append(version)
+        self.post_ids.append(post_id)
+        self.latest[post_id] = (version, deleted)
+        if len(self.versions) > 2 * self.max_entries:
+            self.compact()
+        elif len(self.versions) > self.max_entries:
+            tasks.submit_once("changes.compact", self.compact, key="changes")
+
+    def reset(self, version):
+        """Forgets all history: clients behind `version` have to do a full sync."""
+        self.versions, self.post_ids, self.latest = [], [], {}
+        self.floor = version
+
+    def compact(self):
+        with self.lock:
+            live = sorted((version, post_id) for post_id, (version, _) in self.latest.items())
+            keep = self.max_entries // 2
+            if len(live) > keep:
+                dropped, live = live[:-keep], live[-keep:]
+                self.floor = dropped[-1][0]
+                for _, post_id in dropped:
+                    del self.latest[post_id]
+            self.versions = [version for version, _ in live]
+            self.post_ids = [post_id for _, post_id in live]
+
+    def since(self, version):
+        """
+        Returns [(post_id, version, deleted), ...] changed after `version`, oldest first,
+        or None if the log no longer reaches back that far.
+        """
+        if version < self.floor:
+            return None
+        start = bisect_right(self.versions, version)
+        changes = []
+        for entry_version, post_id in zip(self.versions[start:], self.post_ids[start:]):
+            latest_version, deleted = self.latest[post_id]
+            if latest_version == entry_version:
+                changes.append((post_id, entry_version, deleted))
+        return changes
+
+
+class Shard:
+    """
+    One posts file, parsed only when its signature (mtime + size) changes.
+
+    `posts` is copied before every change, so a list handed out to a reader is
+    never modified under it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.posts = []
+        self.index = {}  # post id -> position in posts
+        self.signature = None
+
+    def file_signature(self):
+        if self.path is None:
+            return self.signature  # memory-only: nothing on disk can change
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Re-reads the file if it changed on disk. Returns True if it did."""
+        signature = self.file_signature()
+        if signature == self.signature:
+            return False
+        if signature is None:
+            posts = []
+        else:
+            posts = read_posts(self.path)
+            metrics.inc("storage_bytes_read_total", signature[1])
+        self.set_posts(posts)
+        self.signature = signature
+        return True
+
+    def set_posts(self, posts):
+        self.posts = list(posts)
+        self.index = {post["id"]: i for i, post in enumerate(self.posts)}
+
+    def put(self, post):
+        self.posts = list(self.posts)
+        position = self.index.get(post["id"])
+        if position is None:
+            self.index[post["id"]] = len(self.posts)
+            self.posts.append(post)
+        else:
+            self.posts[position] = post
+
+    def remove(self, post_id):
+        position = self.index.pop(post_id)
+        self.posts = self.posts[:position] + self.posts[position + 1:]
+        for moved in self.posts[position:]:
+            self.index[moved["id"]] -= 1
+
+    def write(self):
+        """Writes the shard atomically (temp file + rename)."""
+        if self.path is not None:
+            tmp_path = f"{self.path}.tmp"
+            data = encode_posts(self.posts, self.path)
+            with open(tmp_path, "wb") as file:
+                file.write(data)
+            os.replace(tmp_path, self.path)
+            metrics.inc("storage_bytes_written_total", len(data))
+        self.signature = self.file_signature()
+
+
+class PostStore:
+    """
+    Keeps the blog posts in memory and persists them to compact JSON files
+    (gzip-compressed if the path ends in .gz).
+
+    The posts can be split over several shards (one file each), by ranges of
+    SHARD_RANGE ids or by a hash of the category. A shard file is only parsed
+    again when its signature (mtime + size) changes, so reads don't hit the
+    disk. Writes are atomic (temp file + rename), and single-post writes
+    (`put`, `delete`) only rewrite the shard the post lives in. Readers that
+    want to work per shard take `parts()` and run over them with `scatter()`.
+
+    Every save or external reload bumps `version`, a monotonic number (at least
+    the current time in microseconds, so it keeps growing across restarts).
+    Saves that name the changed posts are recorded in `changes`; anything else
+    (first load, edits by another process) resets the change log.
+
+    Each blocking operation has an async twin that runs the file I/O off the
+    event loop, so async servers never block on storage.
+
+    With path None the store is memory-only (read replicas, see replication.py).
+    """
+
+    def __init__(self, path="blog_posts.json.gz", shards=1, shard_by="id"):
+        self.lock = threading.RLock()
+        self.version = 0
+        self.changes = ChangeLog(lock=self.lock)
+        self._waiters = []
+        self._watching = set()
+        self.configure(path, shards, shard_by)
+
+    def configure(self, path, shards=1, shard_by="id"):
+        if shard_by not in SHARD_MODES:
+            raise ValueError(f"SHARD_BY must be one of: {', '.join(SHARD_MODES)}")
+        with self.lock:
+            self.path = path
+            self.shard_by = shard_by
+            self.shards = [Shard(shard_path) for shard_path in shard_paths(path, max(1, shards))]
+            self._posts = None  # merged view, built by load()
+            self._by_id = {}
+            self._shard_of = {}  # post id -> index of the shard it is stored in
+            self._max_id = 0
+            self._layout_checked = False
+
+    def init_app(self, app):
+        """Points the store at the posts file(s) configured for this app."""
+        settings = (app.config.get("POSTS_FILE", self.path), app.config.get("SHARDS", 1),
+                    app.config.get("SHARD_BY", "id"))
+        if settings != (self.path, len(self.shards), self.shard_by):
+            self.configure(*settings)
+
+    def _shard_index(self, post):
+        if len(self.shards) == 1:
+            return 0
+        if self.shard_by == "category":
+            category = post.get("category")
+            if isinstance(category, list):
+                category = category[0] if category else ""
+            key = zlib.crc32(str(category or "").lower().encode())
+        else:
+            key = post["id"] // SHARD_RANGE
+        return key % len(self.shards)
+
+    def shard_for(self, post):
+        return self.shards[self._shard_index(post)]
+
+    def load(self):
+        """
+        Returns a list of all posts (ordered by id when sharded), re-reading files only if they changed.
+        Raises json.JSONDecodeError if a file is corrupted.
+        """
+        with self.lock:
+            self.refresh()
+            if self._posts is None:
+                if len(self.shards) == 1:
+                    self._posts = self.shards[0].posts
+                else:
+                    self._posts = list(heapq.merge(*(sorted(shard.posts, key=_post_id) for shard in self.shards),
+                                                   key=_post_id))
+            return list(self._posts)
+
+    def refresh(self):
+        """Re-reads the shard files that changed on disk, without copying the posts out."""
+        with metrics.span("storage.load"), self.lock:
+            if not self._layout_checked:
+                self._check_layout()
+            changed = any(scatter(Shard.refresh, self.shards))
+            metrics.cache_result("posts", not changed)
+            if changed:
+                self._reindex()
+                self._bump()
+                self.changes.reset(self.version)
+
+    def parts(self):
+        """The posts of each shard, one list per shard. The lists are never modified afterwards."""
+        with self.lock:
+            return [shard.posts for shard in self.shards]
+
+    def fingerprint(self):
+        """Cheap identity of the stored data (file stats, or the version when memory-only)."""
+        if self.path is None:
+            return f"v{self.version}"
+        signatures = (shard.file_signature() for shard in self.shards)
+        return "|".join(f"{s[0]}-{s[1]}" if s else "empty" for s in signatures)
+
+    def get(self, post_id):
+        """Returns the post with this id from the loaded state, or None."""
+        return self._by_id.get(post_id)
+
+    def next_id(self):
+        return self._max_id + 1
+
+    def put(self, post):
+        """Inserts or replaces one post, rewriting only its shard (and the old one if it moved)."""
+        with metrics.span("storage.save"), self.lock:
+            index = self._shard_index(post)
+            old_index = self._shard_of.get(post["id"])
+            if old_index is not None and old_index != index:
+                old_shard = self.shards[old_index]
+                old_shard.remove(post["id"])
+                old_shard.write()
+            shard = self.shards[index]
+            shard.put(post)
+            shard.write()
+            self._by_id[post["id"]] = post
+            self._shard_of[post["id"]] = index
+            self._max_id = max(self._max_id, post["id"])
+            self._committed([(post["id"], False)])
+
+    def delete(self, post_id):
+        """Deletes one post, rewriting only its shard."""
+        with metrics.span("storage.save"), self.lock:
+            del self._by_id[post_id]
+            shard = self.shards[self._shard_of.pop(post_id)]
+            shard.remove(post_id)
+            shard.write()
+            if post_id == self._max_id:
+                self._max_id = max(self._by_id, default=0)
+            self._committed([(post_id, True)])
+
+    def save(self, posts, changed=None, version=None):
+        """
+        Replaces all posts and writes them to disk atomically.
+
+        Args:
+            posts (list): The complete new list of posts.
+            changed (list[tuple[int, bool]] | None): (post id, deleted) pairs touched by
+                this save; only their shards are rewritten. None means unknown, which
+                rewrites every shard and resets the change log.
+            version (int | None): Version to take instead of a new one (replicas
+                mirror the primary's versions).
+        """
+        with metrics.span("storage.save"), self.lock:
+            buckets = [[] for _ in self.shards]
+            for post in posts:
+                buckets[self._shard_index(post)].append(post)
+            touched = None
+            if changed is not None:
+                new_by_id = {post["id"]: post for post in posts}
+                touched = {self._shard_of[post_id] for post_id, _ in changed if post_id in self._shard_of}
+                touched.update(self._shard_index(new_by_id[post_id]) for post_id, _ in changed
+                               if post_id in new_by_id)
+            for i, (shard, bucket) in enumerate(zip(self.shards, buckets)):
+                shard.set_posts(bucket)
+                if touched is None or i in touched:
+                    shard.write()
+            self._reindex()
+            self._committed(changed, version)
+
+    def _check_layout(self):
+        """
+        Makes sure the posts are in the files of the configured layout (shard count and
+        mode, recorded in layout_path()). On a first start, or after SHARDS, SHARD_BY or
+        POSTS_FILE changed, the posts are read from the files of the previous layout
+        (or, without a record, from whatever posts files are there) and written in the
+        new one. Only the recorded files are read afterwards, so copies left behind in
+        old files never come back.
+        """
+        self._layout_checked = True
+        if self.path is None:
+            return
+        layout = {"files": [os.path.basename(shard.path) for shard in self.shards],
+                  "shard_by": self.shard_by if len(self.shards) > 1 else "id"}
+        try:
+            with open(layout_path(self.path)) as file:
+                recorded = json.load(file)
+        except FileNotFoundError:
+            recorded = None
+        if recorded == layout:
+            return
+
+        directory = os.path.dirname(self.path)
+        if recorded is not None:
+            sources = [os.path.join(directory, name) for name in recorded["files"]]
+        else:
+            sources = self._unrecorded_files()
+        sources = [path for path in sources if os.path.exists(path)]
+        if sources:
+            # 👇 A post found twice (a stale copy) is taken from the newest file
+            by_id = {}
+            for source in sorted(sources, key=os.path.getmtime):
+                by_id.update((post["id"], post) for post in read_posts(source))
+            self.save(sorted(by_id.values(), key=_post_id))
+            log.info("Copied the posts from %s into %s (%d shards by %s); files outside the layout are no "
+                     "longer read", ", ".join(sources), self.path, len(self.shards), self.shard_by)
+        tmp_path = layout_path(self.path) + ".tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(layout, file)
+        os.replace(tmp_path, layout_path(self.path))
+
+    def _unrecorded_files(self):
+        """Posts files from before layouts were recorded: numbered shards, else the single file."""
+        directory = os.path.dirname(self.path) or "."
+        stem, extension = _split(os.path.basename(self.path))
+        pattern = re.compile(rf"{re.escape(stem)}\.\d+{re.escape(extension)}")
+        numbered = sorted(os.path.join(os.path.dirname(self.path), name) for name in os.listdir(directory)
+                          if pattern.fullmatch(name))
+        if numbered:
+            return numbered
+        if self.path.endswith(".gz") and not os.path.exists(self.path):
+            return [self.path[:-len(".gz")]]  # switching to .gz: the uncompressed file used before
+        return [self.path]
+
+    def _reindex(self):
+        self._by_id = {post["id"]: post for shard in self.shards for post in shard.posts}
+        self._shard_of = {post["id"]: i for i, shard in enumerate(self.shards) for post in shard.posts}
+        self._max_id = max(self._by_id, default=0)
+        self._posts = None
+
+    def _committed(self, changed, version=None):
+        self._posts = None
+        self._bump(version)
+        if changed is None:
+            self.changes.reset(self.version)
+        else:
+            for post_id, deleted in changed:
+                self.changes.record(self.version, post_id, deleted)
+
+    def changes_since(self, version):
+        """
+        Returns (current version, [(post id, post, version, deleted), ...]) for posts changed
+        after `version`, where post is the current post or None for deletes.
+        The list is None if the history doesn't reach back that far (full sync needed).
+        """
+        with self.lock:
+            self.refresh()
+            changes = self.changes.since(version)
+            if changes is None:
+                return self.version, None
+            return self.version, [(post_id, self._by_id.get(post_id), changed_at, deleted)
+                                  for post_id, changed_at, deleted in changes]
+
+    async def refresh_async(self):
+        await asyncio.to_thread(self.refresh)
+
+    def _bump(self, version=None):
+        self.version = version if version is not None else max(self.version + 1, time.time_ns() // 1000)
+        waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve, future, self.version)
+
+    async def wait_for_change(self, version, timeout):
+        """
+        Waits (without holding a thread) until the store moves past `version`.
+        Returns the current version, unchanged if the timeout ran out.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self.lock:
+            if self.version != version:
+                return self.version
+            self._waiters.append((loop, future))
+        if loop not in self._watching:
+            self._watching.add(loop)
+            loop.create_task(self._watch_file(loop))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            return self.version
+        finally:
+            with self.lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+
+    async def _watch_file(self, loop):
+        """One task per event loop picks up changes written by other processes."""
+        try:
+            while any(waiter_loop is loop for waiter_loop, _ in self._waiters):
+                await asyncio.sleep(POLL_INTERVAL)
+                try:
+                    await self.refresh_async()
+                except json.JSONDecodeError:
+                    pass  # half-written by another process, next round will see it
+        finally:
+            self._watching.discard(loop)
+
+
+def _resolve(future, version):
+    if not future.done():
+        future.set_result(version)
+
+
+store = PostStore()
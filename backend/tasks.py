@@ -0,0 +1,166 @@
+"""
+Background task queue for work that doesn't have to finish before the response.
+
+Mutations return as soon as the posts file is written; change-feed fan-out,
+category counts and change-log compaction are handed to a small thread pool:
+
+    tasks.submit("changefeed.publish", feed.publish, "post.liked", data, key="changefeed")
+    tasks.submit_once("ranking.sync", top_index.sync, key="ranking")
+
+Tasks with the same `key` run one after another in submission order (they go
+to the same worker), others are spread over the workers. `submit` is bounded:
+when a worker has `queue_size / workers` tasks waiting, it blocks until one
+finishes, so a backlog slows writers down instead of growing without limit.
+It never runs a task in the calling thread (that would let it jump ahead of
+queued tasks and run under the caller's locks), so don't call it while holding
+a lock a task needs.
+
+`submit_once` is for idempotent catch-up work (index syncs, recounts): while
+a task of that name is waiting, further submits are dropped, so it never
+blocks and is safe to call under any lock. `drain()` stops the workers after
+finishing what is queued; it runs on interpreter exit and on ASGI/gunicorn
+worker shutdown.
+"""
+import atexit
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+import zlib
+from metrics import metrics
+
+DEFAULT_WORKERS = 2
+DEFAULT_QUEUE_SIZE = 1000  # tasks waiting, over all workers
+DRAIN_TIMEOUT = 10         # seconds to wait for queued tasks on shutdown
+
+log = logging.getLogger(__name__)
+_STOP = object()
+
+
+class TaskQueue:
+    def __init__(self, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        self.lock = threading.Lock()
+        self.closed = False
+        self.configure(workers, queue_size)
+        metrics.gauge("task_queue_depth", self.depth)
+
+    def configure(self, workers, queue_size):
+        """Sets the pool size. Threads are started lazily (after a fork) by the first submit."""
+        self.workers = max(1, workers)
+        # 👇 The queues themselves are unbounded: submit() bounds its tasks with the slots,
+        # submit_once() tasks are at most one per name
+        self.queues = [queue.Queue() for _ in range(self.workers)]
+        self.slots = [threading.BoundedSemaphore(max(1, queue_size // self.workers)) for _ in range(self.workers)]
+        self.pending = set()  # names of submit_once tasks waiting to run
+        self.threads = []
+        self._pid = None
+        self._next = itertools.count()
+
+    def init_app(self, app):
+        self.configure(app.config.get("TASK_WORKERS", DEFAULT_WORKERS),
+                       app.config.get("TASK_QUEUE_SIZE", DEFAULT_QUEUE_SIZE))
+
+    def depth(self):
+        return sum(q.qsize() for q in self.queues)
+
+    def submit(self, name, function, *args, key=None, **kwargs):
+        """
+        Queues `function(*args, **kwargs)` to run in the background.
+
+        Args:
+            name (str): Task name, used as the metrics label.
+            function (callable): The work to do.
+            key (str | None): Tasks sharing a key run in submission order.
+        """
+        if self.closed:
+            return self._run((name, function, args, kwargs, time.perf_counter(), None), inline=True)
+        self._start()
+        index = self._index(key)
+        slot = self.slots[index]
+        if not slot.acquire(blocking=False):
+            metrics.inc("tasks_backpressure_total", task=name)
+            slot.acquire()
+        self.queues[index].put((name, function, args, kwargs, time.perf_counter(), slot))
+        metrics.inc("tasks_submitted_total", task=name)
+
+    def submit_once(self, name, function, key=None):
+        """
+        Queues `function()` unless a task of this name is already waiting.
+        Never blocks. After drain() it does nothing: the work is catch-up work
+        that the next reader redoes anyway.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            if name in self.pending:
+                metrics.inc("tasks_coalesced_total", task=name)
+                return
+            self.pending.add(name)
+        self._start()
+        self.queues[self._index(key)].put((name, function, (), {}, time.perf_counter(), name))
+        metrics.inc("tasks_submitted_total", task=name)
+
+    def _index(self, key):
+        return (zlib.crc32(key.encode()) if key is not None else next(self._next)) % self.workers
+
+    def drain(self, timeout=DRAIN_TIMEOUT):
+        """Finishes the queued tasks and stops the workers. Later submits run inline."""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            threads = self.threads if self._pid == os.getpid() else []
+        for task_queue in self.queues[:len(threads)]:
+            task_queue.put(_STOP)
+        deadline = time.monotonic() + timeout
+        for thread in threads:
+            thread.join(max(0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in threads):
+            log.warning("Task queue drain timed out with %d tasks left", self.depth())
+
+    def _start(self):
+        if self._pid == os.getpid():
+            return
+        with self.lock:
+            if self._pid == os.getpid() or self.closed:
+                return
+            # 👇 Threads don't survive a fork: a preloaded gunicorn worker starts its own
+            self.threads = [threading.Thread(target=self._work, args=(task_queue,), daemon=True,
+                                             name=f"task-worker-{i}")
+                            for i, task_queue in enumerate(self.queues)]
+            for thread in self.threads:
+                thread.start()
+            self._pid = os.getpid()
+
+    def _work(self, task_queue):
+        while True:
+            task = task_queue.get()
+            if task is _STOP:
+                return
+            self._run(task)
+
+    def _run(self, task, inline=False):
+        name, function, args, kwargs, queued_at, ticket = task
+        if isinstance(ticket, str):
+            with self.lock:
+                # 👇 Cleared before running, so a change made while it runs queues another pass
+                self.pending.discard(ticket)
+        elif ticket is not None:
+            ticket.release()
+        start = time.perf_counter()
+        if not inline:
+            metrics.observe("task_wait_seconds", start - queued_at, task=name)
+        result = "ok"
+        try:
+            function(*args, **kwargs)
+        except Exception:
+            result = "error"
+            log.exception("Background task %s failed", name)
+        metrics.observe("task_duration_seconds", time.perf_counter() - start, task=name)
+        metrics.inc("tasks_completed_total", task=name, result=result)
+
+
+tasks = TaskQueue()
+atexit.register(tasks.drain)
@@ -1,6 +1,8 @@
-from flask import jsonify
-import os
-import json
+from flask import current_app, g, jsonify, request
+import hashlib
+from storage import store
+from metrics import metrics
+from singleflight import flights
 
 
 def validate_post_data(data):
@@ -16,16 +18,66 @@ def validate_post_data(data):
     return None
 
 
-def load_posts():
+def posts_etag(fingerprint=None):
     """
-    Loads blog posts from blog_posts.json.
-    Returns a list of posts or a Flask response if file is invalid.
+    Builds a cheap validator for the current GET request.
+    Uses the posts file signatures (mtime + size) and the query, so no parsing is needed.
+    Pass `fingerprint` to tag a response with a store state read earlier.
     """
-    if not os.path.exists("blog_posts.json"):
-        return []
-
-    try:
-        with open("blog_posts.json", "r") as file:
-            return json.load(file)
-    except json.JSONDecodeError:
-        return jsonify({"error": "Server data is corrupted. Please contact support."}), 500
\ No newline at end of file
+    if fingerprint is None:
+        fingerprint = store.fingerprint()
+    return hashlib.md5(f"{fingerprint}:{request.full_path}".encode()).hexdigest()
+
+
+def is_revalidation():
+    """True if the client already holds the current version of this GET response."""
+    return (
+        request.method == "GET"
+        and bool(request.if_none_match)
+        and request.if_none_match.contains_weak(posts_etag())  # compressed responses carry weak ETags
+    )
+
+
+def conditional_jsonify(compute, status=200):
+    """
+    Returns compute() as JSON with an ETag, answered as 304 if the client is up to date.
+    The ETag is taken before compute() runs: a write in between leaves an older
+    ETag on a newer body (one extra refetch), never a current ETag on stale data.
+    """
+    etag = posts_etag()
+    payload = compute()
+    with metrics.span("serialize"):
+        response = jsonify(payload)
+    response.status_code = status
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+def mark_cache_hit():
+    """Flags the response as served from cache, so rate limits don't count it (see rate_limit.py)."""
+    g.cache_hit = True
+
+
+def coalesced_jsonify(name, key, compute):
+    """
+    Like conditional_jsonify(compute), but concurrent requests with the same
+    key (the normalized query) share one computation and serialization.
+    Requests that got another request's result are marked as cache hits.
+    """
+    computed = []
+
+    def serialize():
+        computed.append(True)
+        payload = compute()
+        with metrics.span("serialize"):
+            return jsonify(payload).get_data()
+
+    # 👇 Read once, before the flight: a request that arrives after a write doesn't share an
+    #    older result, and the ETag never describes a newer state than the body it is set on
+    fingerprint = store.fingerprint()
+    body = flights.do(name, (key, fingerprint), serialize)
+    if not computed:
+        mark_cache_hit()
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    response.set_etag(posts_etag(fingerprint))
+    return response.make_conditional(request)
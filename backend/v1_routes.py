@@ -0,0 +1,90 @@
+from flask import Blueprint, request, jsonify
+from auth import register_user, login_user, token_required
+from utils import coalesced_jsonify, conditional_jsonify
+from rate_limit import limiter, hot_limit
+import engine
+
+v1 = Blueprint("v1", __name__, url_prefix="/api/v1")
+
+
+@v1.route("/posts", methods=["GET"])
+@limiter.exempt # Define Stop Limiting (maybe for all GET requests)
+def get_posts():
+    """Returns a paginated and optionally filtered/sorted list of blog posts."""
+    query = engine.PostQuery.from_args(request.args)
+    return coalesced_jsonify("posts", query, lambda: engine.run_query(query).to_dict())
+
+
+@v1.route('/posts', methods=['POST'])
+@token_required
+@limiter.limit("5 per minute") # Allows productive work but prevents Spam
+def add_post(current_user):
+    """Creates a new blog post for the logged-in user."""
+    new_post = engine.create_post(request.get_json(silent=True), current_user)  # 🧠 use username from token
+    return jsonify(new_post), 201
+
+
+@v1.route("/posts/<int:post_id>", methods=['DELETE'])
+@token_required
+@limiter.limit("5 per minute") # Allows productive work but prevents Spam
+def delete_post(current_user, post_id):
+    """Deletes a blog post if it belongs to the current user."""
+    engine.delete_post(post_id, current_user)
+    return jsonify({"message": f"Post {post_id} deleted"}), 200
+
+
+@v1.route("/posts/<int:post_id>", methods=['PUT'])
+@limiter.limit("5 per minute") # Allows productive work but prevents Spam
+@token_required
+def update_post(current_user, post_id):
+    """Updates a blog post's title, content, or category if user owns the post."""
+    post = engine.update_post(post_id, request.get_json(silent=True), current_user)
+    return jsonify(post), 200
+
+
+@v1.route("/posts/search", methods=['GET'])
+@limiter.exempt
+@hot_limit("10 per minute")  # checked in-process, synced to the limiter storage
+def search_post():
+    """Searches posts by title, content, or author."""
+    text = request.args.get("q", "")
+    return coalesced_jsonify("search", text.strip().lower(), lambda: engine.search_posts(text))
+
+
+@v1.route("/categories", methods=["GET"])
+@limiter.exempt
+def get_categories():
+    """Returns a unique sorted list of all categories in blog posts."""
+    return conditional_jsonify(engine.list_categories)
+
+
+@v1.route("/posts/<int:post_id>/like", methods=["POST"])
+@limiter.limit("20 per minute") # Potential abuse, limiting required, as well
+def like_post(post_id):
+    """Increments the like count of a post by its ID."""
+    post = engine.like_post(post_id)
+    return jsonify({"message": f"Post {post_id} liked", "likes": post["likes"]}), 200
+
+
+'''Register & Login Part'''
+@v1.route("/register", methods=["POST"])
+@limiter.limit("3 per minute") # Vulnerable for Brute-Force-Attacks
+def register():
+    """Registers a new user with username and password."""
+    return register_user()
+
+
+@v1.route("/login", methods=["POST"])
+@limiter.limit("5 per minute") # Vulnerable for Brute-Force-Attacks
+def login():
+    """Authenticates a user and returns a token."""
+    return login_user()
+
+
+# Debug/Test-Route
+@v1.route('/secret', methods=['GET'])
+@token_required
+@limiter.limit("3 per minute")
+def secret(current_user):
+    """Protected test route to verify token authentication."""
+    return jsonify({'message': f'Welcome, {current_user}!'}), 200
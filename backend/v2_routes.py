@@ -1,21 +1,12 @@
 from flask import Blueprint, jsonify, request
-from flasgger import swag_from
-import json
-from datetime import datetime
-from utils import load_posts, validate_post_data
-from rate_limit import limiter
+from docs import swag_from
+from utils import coalesced_jsonify, conditional_jsonify
+from rate_limit import limiter, hot_limit
 from auth import token_required
+import engine
 
 v2 = Blueprint("v2", __name__, url_prefix="/api/v2")
 
-# -------------------------
-# 🔧 Utility functions
-# -------------------------
-
-def save_posts(posts):
-    with open("blog_posts.json", "w") as file:
-        json.dump(posts, file, indent=4)
-
 # -------------------------
 # 📚 Swagger schemas
 # -------------------------
@@ -46,10 +37,15 @@ post_schema = {
     "parameters": [
         {"name": "category", "in": "query", "type": "string", "description": "Filter by a single category"},
         {"name": "categories", "in": "query", "type": "string", "description": "Filter by multiple categories, comma-separated (e.g., Technology,Science)"},
+        {"name": "author", "in": "query", "type": "string", "description": "Filter by a single author"},
+        {"name": "authors", "in": "query", "type": "string", "description": "Filter by multiple authors, comma-separated; combined with the categories (AND)"},
+        {"name": "facets", "in": "query", "type": "string", "description": "Count the matching posts per value of these fields, comma-separated (category,author)"},
         {"name": "sort", "in": "query", "type": "string", "enum": ["title", "author", "likes", "date", "updated"], "description": "Sort by field"},
         {"name": "direction", "in": "query", "type": "string", "enum": ["asc", "desc"], "default": "asc", "description": "Sort direction"},
         {"name": "page", "in": "query", "type": "integer", "default": 1, "description": "Page number"},
-        {"name": "limit", "in": "query", "type": "integer", "default": 5, "description": "Results per page"}
+        {"name": "limit", "in": "query", "type": "integer", "default": 5, "description": "Results per page"},
+        {"name": "cursor", "in": "query", "type": "string", "description": "Continue after a previous page (use its next_cursor instead of page)"},
+        {"name": "fields", "in": "query", "type": "string", "description": "Only return these fields, comma-separated (e.g., id,title,likes)"}
     ],
     "responses": {
         200: {
@@ -60,7 +56,9 @@ post_schema = {
                     "posts": {
                         "type": "array",
                         "items": post_schema
-                    }
+                    },
+                    "next_cursor": {"type": "string"},
+                    "facets": {"type": "object", "description": "Posts per category / author within the result, if requested"}
                 }
             },
             "examples": {
@@ -84,45 +82,8 @@ post_schema = {
 
 @limiter.exempt # Define Stop Limiting (maybe for all GET requests)
 def get_posts_v2():
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    sort_field = request.args.get("sort")
-    direction = request.args.get("direction", "asc")
-    category = request.args.get("category")
-    categories = request.args.get("categories")
-
-    page = int(request.args.get("page", 1))
-    limit = int(request.args.get("limit", 5))
-
-    filtered = posts.copy()
-
-    if category:
-        filtered = [p for p in filtered if p["category"].lower() == category.lower()]
-    elif categories:
-        cat_list = [c.strip().lower() for c in categories.split(",")]
-        filtered = [p for p in filtered if p["category"].lower() in cat_list]
-
-    if sort_field:
-        reverse = direction == "desc"
-        filtered.sort(
-            key=lambda post: (
-                post.get(sort_field, "").lower()
-                if isinstance(post.get(sort_field), str)
-                else post.get(sort_field, "")
-            ),
-            reverse=reverse
-        )
-
-    start = (page - 1) * limit
-    end = start + limit
-    return jsonify({
-        "page": page,
-        "limit": limit,
-        "total_posts": len(filtered),
-        "posts": filtered[start:end]
-    })
+    query = engine.PostQuery.from_args(request.args)
+    return coalesced_jsonify("posts", query, lambda: engine.run_query(query).to_dict())
 
 
 # -------------------------
@@ -168,25 +129,7 @@ def get_posts_v2():
 @token_required
 @limiter.limit("5 per minute") # Allows productive work but prevents Spam
 def add_post_v2(current_user):
-    data = request.get_json()
-    error = validate_post_data(data)
-    if error:
-        return jsonify(error), 400
-
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-    new_post = {
-        "id": max((post["id"] for post in posts), default=0) + 1,
-        "author": "SwaggerUser",  # For demo. Replace with actual user in full auth version.
-        "title": data["title"],
-        "content": data["content"],
-        "category": data["category"],
-        "date": datetime.now().strftime("%B %d, %Y"),
-        "likes": 0
-    }
-    posts.append(new_post)
-    save_posts(posts)
+    new_post = engine.create_post(request.get_json(silent=True), current_user)
     return jsonify(new_post), 201
 
 
@@ -250,27 +193,8 @@ def add_post_v2(current_user):
 @token_required
 @limiter.limit("5 per minute") # Allows productive work but prevents Spam
 def update_post_v2(current_user, post_id):
-    # (basic version without auth for now)
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    for post in posts:
-        if post['id'] == post_id:
-            new_data = request.get_json()
-            error = validate_post_data(new_data)
-            if error:
-                return jsonify(error), 400
-
-            post.update({
-                "title": new_data["title"],
-                "content": new_data["content"],
-                "category": new_data["category"],
-                "updated": datetime.now().strftime("%B %d, %Y")
-            })
-            save_posts(posts)
-            return jsonify(post), 200
-    return jsonify({"error": "Post not found"}), 404
+    post = engine.update_post(post_id, request.get_json(silent=True), current_user)
+    return jsonify(post), 200
 
 
 @v2.route("/posts/<int:post_id>", methods=["DELETE"])
@@ -304,16 +228,8 @@ def update_post_v2(current_user, post_id):
 @token_required
 @limiter.limit("5 per minute") # Allows productive work but prevents Spam
 def delete_post_v2(current_user, post_id):
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    for post in posts:
-        if post["id"] == post_id:
-            posts.remove(post)
-            save_posts(posts)
-            return jsonify({"message": f"Post {post_id} deleted successfully"}), 200
-    return jsonify({"error": "Post not found"}), 404
+    engine.delete_post(post_id, current_user)
+    return jsonify({"message": f"Post {post_id} deleted successfully"}), 200
 
 
 @v2.route("/categories", methods=["GET"])
@@ -337,12 +253,7 @@ def delete_post_v2(current_user, post_id):
 
 @limiter.exempt
 def get_categories_v2():
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    categories = sorted({p["category"] for p in posts if p.get("category")})
-    return jsonify(categories)
+    return conditional_jsonify(engine.list_categories)
 
 
 @v2.route("/posts/search", methods=["GET"])
@@ -390,26 +301,11 @@ def get_categories_v2():
         }
     }
 })
-@limiter.limit("10 per minute")
+@limiter.exempt
+@hot_limit("10 per minute")  # checked in-process, synced to the limiter storage
 def search_posts_v2():
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
-
-    query = request.args.get("q", "").strip().lower()
-
-    if not query:
-        return jsonify({"error": "Missing query parameter `q`"}), 400
-
-    results = [p for p in posts if
-               query in p.get("title", "").lower() or
-               query in p.get("content", "").lower() or
-               query in p.get("author", "").lower()]
-
-    if not results:
-        return jsonify({"error": f"No posts found matching '{query}'"}), 404
-
-    return jsonify(results)
+    text = request.args.get("q", "")
+    return coalesced_jsonify("search", text.strip().lower(), lambda: engine.search_posts(text))
 
 
 @v2.route("/posts/<int:post_id>/like", methods=["POST"])
@@ -455,47 +351,118 @@ def search_posts_v2():
 })
 @limiter.limit("20 per minute") # Potential abuse, limiting required, as well
 def like_post_v2(post_id):
-    posts = load_posts()
-    if isinstance(posts, tuple):  # Handles file corruption, sends error response and status code
-        return posts
+    post = engine.like_post(post_id)
+    return jsonify({"message": f"Post {post_id} liked", "likes": post["likes"]}), 200
 
-    for post in posts:
-        if post["id"] == post_id:
-            post["likes"] = post.get("likes", 0) + 1
-            save_posts(posts)
-            return jsonify({"message": f"Post {post_id} liked", "likes": post["likes"]}), 200
 
-    return jsonify({"error": f"Post with ID {post_id} not found"}), 404
+@v2.route("/stream", methods=["GET"])
+@swag_from({
+    "tags": ["Posts"],
+    "summary": "Live changes (server-sent events)",
+    "description": "Keeps the connection open and pushes a compact event for every change: "
+                   "post.created, post.updated, post.deleted, post.liked, comment.added. "
+                   "A `resync` event means the client fell behind and should reload.",
+    "produces": ["text/event-stream"],
+    "responses": {
+        200: {
+            "description": "Event stream",
+            "examples": {
+                "text/event-stream": "id: 7\nevent: post.liked\ndata: {\"id\": 3, \"likes\": 14}\n\n"
+            }
+        },
+        501: {"description": "Not served by WSGI servers; run uvicorn asgi:application"}
+    }
+})
+@limiter.exempt
+def stream_v2():
+    # 👇 asgi.py answers this path on the event loop. Under WSGI every open stream would hold a
+    # server thread for as long as the tab stays open, so clients fall back to re-fetching.
+    return jsonify({"error": "Live updates need the ASGI server (uvicorn asgi:application)"}), 501
 
 
-from auth import register_user, login_user
+@v2.route("/posts/top", methods=["GET"])
+@swag_from({
+    "tags": ["Posts"],
+    "summary": "Top posts by likes or trending score",
+    "description": "Served from a ranking index that is kept sorted as likes come in. "
+                   "`trending` ranks by likes with a 24 hour half-life; each post then "
+                   "carries its current decayed score as `trending`.",
+    "parameters": [
+        {"name": "n", "in": "query", "type": "integer", "default": 10, "description": "Number of posts (1-100)"},
+        {"name": "category", "in": "query", "type": "string", "description": "Only posts in this category"},
+        {"name": "by", "in": "query", "type": "string", "enum": ["likes", "trending"], "default": "likes"}
+    ],
+    "responses": {
+        200: {
+            "description": "Best posts first",
+            "examples": {
+                "application/json": {
+                    "by": "likes",
+                    "category": "Technology",
+                    "posts": [{"id": 3, "title": "Hello", "category": "Technology", "likes": 14}]
+                }
+            }
+        },
+        400: {"description": "Invalid 'n' or 'by'"}
+    }
+})
+@limiter.exempt
+def top_posts_v2():
+    args = request.args
+    by = args.get("by", "likes")
 
+    def top():
+        return engine.top_posts(args.get("n", 10), args.get("category"), by)
 
-@v2.route("/posts/<int:post_id>/comments", methods=["POST"])
-def add_comment_v2(post_id):
-    posts = load_posts()
-    if isinstance(posts, tuple):
-        return posts
-
-    data = request.get_json()
-    if not data or not data.get("text"):
-        return jsonify({"error": "Comment text required"}), 400
-
-    comment = {
-        "author": data.get("author", "Anonymous"),
-        "text": data["text"],
-        "date": datetime.now().strftime("%B %d, %Y")
+    if by == "trending":
+        # 👇 Scores decay between writes, so the posts-file ETag would revalidate stale scores
+        return jsonify(top())
+    return conditional_jsonify(top)
+
+
+@v2.route("/posts/changes", methods=["GET"])
+@swag_from({
+    "tags": ["Posts"],
+    "summary": "Changes since a version (delta sync)",
+    "description": "Returns the posts created, updated or deleted after `since`, oldest first. "
+                   "Keep the returned `version` and pass it as `since` next time. "
+                   "Without `since`, or when the change history no longer reaches back that far, "
+                   "the answer has `reset: true` and the full list of posts instead.",
+    "parameters": [
+        {"name": "since", "in": "query", "type": "integer", "required": False,
+         "description": "Version from a previous response (or the id of the last stream event)"}
+    ],
+    "responses": {
+        200: {
+            "description": "Changes, or a full snapshot when `reset` is true",
+            "examples": {
+                "application/json": {
+                    "version": 1760870400123456,
+                    "reset": False,
+                    "changes": [
+                        {"op": "upsert", "version": 1760870400120001,
+                         "post": {"id": 3, "title": "Hello", "likes": 14}},
+                        {"op": "delete", "version": 1760870400123456, "id": 5}
+                    ]
+                }
+            }
+        },
+        400: {"description": "'since' is not an integer"}
     }
+})
+@limiter.exempt
+def get_changes_v2():
+    return conditional_jsonify(lambda: engine.changes_since(request.args.get("since")))
 
-    for post in posts:
-        if post["id"] == post_id:
-            post.setdefault("comments", []).append(comment)
-            save_posts(posts)
-            return jsonify({"message": "Comment added", "comment": comment}), 201
 
-    return jsonify({"error": "Post not found"}), 404
+from auth import register_user, login_user
 
 
+@v2.route("/posts/<int:post_id>/comments", methods=["POST"])
+def add_comment_v2(post_id):
+    comment = engine.add_comment(post_id, request.get_json(silent=True))
+    return jsonify({"message": "Comment added", "comment": comment}), 201
+
 
 # -------------------------
 # 🔐 POST /register
@@ -0,0 +1,10 @@
+"""
+WSGI entry point for production servers.
+
+Run with:  gunicorn -c gunicorn.conf.py wsgi:app
+"""
+import os
+from backend_app import create_app, warm_up
+
+app = create_app(os.environ.get("BLOG_CONFIG", "production"))
+warm_up(app)  # with preload_app this runs once in the master, workers inherit the parsed store
@@ -0,0 +1,162 @@
+"""
+Asset pipeline for the frontend.
+
+At startup every file under static/ is copied to build/assets/ under a
+content-hashed name (styles.css -> styles.3f2a1b9c0d.css), text assets get
+precompressed .gz and .br siblings, and images get resized WebP/PNG variants
+(brotli and Pillow are in requirements.txt; without them only .gz is built and
+images are served as they are). Templates link assets through
+`asset("styles.css")`, so a changed file gets a new URL and everything can be
+cached forever:
+
+    /assets/<hashed name>  ->  Cache-Control: public, max-age=31536000, immutable
+
+The precompressed variant matching the request's Accept-Encoding is sent as is.
+Running `python assets.py` builds the assets and prints the page weight of a
+cold and a warm visit, before and after.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import Blueprint, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # not installed, .gz only
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # not installed, images are served as they are
+    Image = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+BUILD_DIR = os.path.join(BASE_DIR, "build", "assets")
+ONE_YEAR = 365 * 24 * 3600
+TEXT_TYPES = (".css", ".js", ".svg", ".json", ".txt", ".html")
+IMAGE_TYPES = (".png", ".jpg", ".jpeg")
+IMAGE_WIDTHS = (640, 1280, 1920)
+ENCODINGS = (("br", ".br"), ("gzip", ".gz")) if brotli is not None else (("gzip", ".gz"),)
+
+assets = Blueprint("assets", __name__)
+manifest = {"files": {}, "variants": {}}
+
+
+def _hashed_name(relative_path, data):
+    stem, extension = os.path.splitext(relative_path)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+
+
+def _write(path, data):
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as file:
+            file.write(data)
+
+
+def _image_variants(source, hashed):
+    """Resized WebP and PNG versions of an image, as {"webp": [[width, name], ...], "png": [...]}."""
+    variants = {"webp": [], "png": []}
+    with Image.open(source) as image:
+        widths = [w for w in IMAGE_WIDTHS if w < image.width] + [image.width]
+        stem = os.path.splitext(hashed)[0]
+        for width in widths:
+            for image_format, options in (("webp", {"quality": 80}), ("png", {"optimize": True})):
+                name = f"{stem}.{width}w.{image_format}"
+                target = os.path.join(BUILD_DIR, name)
+                if not os.path.exists(target):
+                    resized = image.resize((width, round(image.height * width / image.width)))
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    resized.save(target, image_format.upper(), **options)
+                variants[image_format].append([width, name])
+    return variants
+
+
+def build(static_folder):
+    """Builds hashed, precompressed and resized assets from `static_folder` and returns the manifest."""
+    files, variants = {}, {}
+    for root, _, names in os.walk(static_folder):
+        for name in names:
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as file:
+                data = file.read()
+            hashed = _hashed_name(relative, data)
+            target = os.path.join(BUILD_DIR, hashed)
+            _write(target, data)
+            files[relative] = hashed
+            extension = os.path.splitext(name)[1].lower()
+            if extension in TEXT_TYPES:
+                _write(target + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+                if brotli is not None:
+                    _write(target + ".br", brotli.compress(data, quality=11))
+            elif extension in IMAGE_TYPES and Image is not None:
+                variants[relative] = _image_variants(source, hashed)
+    built = {"files": files, "variants": variants}
+    with open(os.path.join(BUILD_DIR, "manifest.json"), "w") as file:
+        json.dump(built, file, indent=2)
+    return built
+
+
+def asset(name):
+    """URL of the current version of a static file, e.g. asset("styles.css")."""
+    return url_for("assets.serve_asset", filename=manifest["files"][name])
+
+
+def image_srcset(name, image_format):
+    """srcset of the resized variants of an image ("" if there are none)."""
+    return ", ".join(f"{url_for('assets.serve_asset', filename=variant)} {width}w"
+                     for width, variant in manifest["variants"].get(name, {}).get(image_format, []))
+
+
+def init_assets(app):
+    """Builds the assets and registers the /assets route and the template helpers."""
+    manifest.update(build(app.static_folder))
+    app.register_blueprint(assets)
+    app.add_template_global(asset)
+    app.add_template_global(image_srcset)
+
+
+@assets.route("/assets/<path:filename>")
+def serve_asset(filename):
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding, suffix = next(((encoding, suffix) for encoding, suffix in ENCODINGS
+                             if request.accept_encodings[encoding] > 0
+                             and os.path.exists(os.path.join(BUILD_DIR, filename + suffix))), (None, ""))
+    response = send_from_directory(BUILD_DIR, filename + suffix, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def page_weight(static_folder, page_assets):
+    """Bytes a cold visit downloads for `page_assets`, before (plain /static) and after (hashed, compressed)."""
+    built = build(static_folder)
+    rows = []
+    for name in page_assets:
+        plain = os.path.getsize(os.path.join(static_folder, name))
+        hashed = os.path.join(BUILD_DIR, built["files"][name])
+        compressed = min([os.path.getsize(hashed + suffix) for _, suffix in ENCODINGS
+                          if os.path.exists(hashed + suffix)] or [os.path.getsize(hashed)])
+        variants = built["variants"].get(name, {}).get("webp")
+        if variants:  # a typical 1280px wide screen picks this one
+            width, variant = min(variants, key=lambda v: abs(v[0] - 1280))
+            compressed = os.path.getsize(os.path.join(BUILD_DIR, variant))
+        rows.append((name, plain, compressed))
+    return rows
+
+
+if __name__ == "__main__":
+    static = os.path.join(BASE_DIR, "static")
+    shutil.rmtree(BUILD_DIR, ignore_errors=True)
+    rows = page_weight(static, ["styles.css", "main.js", "images/salmanac.png"])
+    for name, plain, compressed in rows:
+        print(f"{name:<22} {plain:>10} -> {compressed:>10} bytes")
+    print(f"{'cold visit':<22} {sum(r[1] for r in rows):>10} -> {sum(r[2] for r in rows):>10} bytes")
+    print(f"{'warm visit':<22} {len(rows)} revalidations -> 0 requests (immutable)")
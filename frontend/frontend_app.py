@@ -1,11 +1,15 @@
 from flask import Flask, render_template
+from assets import init_assets
+from prerender import bootstrap, init_prerender
 
 app = Flask(__name__)
+init_assets(app)
+init_prerender(app)
 
 
 @app.route('/', methods=['GET'])
 def home():
-    return render_template("index.html")
+    return render_template("index.html", bootstrap=bootstrap(app))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,103 @@
+"""
+Optional server-side render of the first page.
+
+Without it the browser loads index.html, then main.js fetches /posts and
+/categories before anything appears. With SSR_API_URL set (the API base the
+page defaults to, e.g. http://127.0.0.1:5021/api/v2) the frontend fetches both
+itself and embeds them in the HTML, as markup for the first paint and as a JSON
+bootstrap blob main.js renders from instead of calling the API:
+
+    <script id="bootstrap" type="application/json">{"apiBaseUrl": ..., "posts": ..., "categories": ...}</script>
+
+Responses are shared by all page views for CACHE_TTL and then revalidated with
+If-None-Match, so a busy frontend mostly gets 304s from the API. Both are
+fetched in parallel against one FETCH_TIMEOUT deadline. If the API is slow or
+down the page is served without the bootstrap and main.js fetches as before;
+the failure is remembered for CACHE_TTL, so page views in the meantime don't
+wait on the API again.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent import futures
+
+CACHE_TTL = 2.0         # seconds a fetched response is reused without asking the API
+FETCH_TIMEOUT = 1.0     # seconds for all fetches together; a slow API must not hold up the page
+FETCHED_PATHS = ("/posts", "/categories")
+
+log = logging.getLogger(__name__)
+
+
+class ApiCache:
+    """Shared, ETag-revalidated cache of API GET responses."""
+
+    def __init__(self, ttl=CACHE_TTL):
+        self.ttl = ttl
+        self.entries = {}  # url -> (fetched at, etag, data)
+        self.failed_at = None  # when the API last didn't answer in time
+        self.lock = threading.Lock()
+
+    def get(self, url):
+        with self.lock:
+            entry = self.entries.get(url)
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return entry[2]
+
+        headers = {"Accept": "application/json"}
+        if entry and entry[1]:
+            headers["If-None-Match"] = entry[1]
+        try:
+            with urllib.request.urlopen(urllib.request.Request(url, headers=headers),
+                                        timeout=FETCH_TIMEOUT) as response:
+                entry = (time.monotonic(), response.headers.get("ETag"), json.load(response))
+        except urllib.error.HTTPError as error:
+            if error.code != 304 or entry is None:
+                raise
+            entry = (time.monotonic(), entry[1], entry[2])
+        with self.lock:
+            self.entries[url] = entry
+        return entry[2]
+
+    def is_down(self):
+        """True while a recent failure is still within the TTL."""
+        return self.failed_at is not None and time.monotonic() - self.failed_at < self.ttl
+
+
+cache = ApiCache()
+fetcher = futures.ThreadPoolExecutor(max_workers=len(FETCHED_PATHS), thread_name_prefix="prerender")
+
+
+def init_prerender(app):
+    """Reads SSR_API_URL; server-side rendering stays off without it."""
+    app.config.setdefault("SSR_API_URL", os.environ.get("SSR_API_URL"))
+
+
+def bootstrap(app):
+    """
+    Fetches the first page and the category list for embedding in the page.
+
+    Returns:
+        dict | None: {"apiBaseUrl", "posts", "categories"}, or None when
+            server-side rendering is off or the API didn't answer in time
+            (now or within the last CACHE_TTL).
+    """
+    base_url = app.config.get("SSR_API_URL")
+    if not base_url or cache.is_down():
+        return None
+    base_url = base_url.rstrip("/")
+    deadline = time.monotonic() + FETCH_TIMEOUT
+    fetches = [fetcher.submit(cache.get, base_url + path) for path in FETCHED_PATHS]
+    try:
+        posts, categories = (fetch.result(timeout=max(0.0, deadline - time.monotonic()))
+                             for fetch in fetches)
+    except (OSError, ValueError, futures.TimeoutError) as error:
+        cache.failed_at = time.monotonic()
+        log.warning("Server-side render skipped for %ss, %s didn't answer: %s", cache.ttl, base_url,
+                    error or "timed out")
+        return None
+    cache.failed_at = None
+    return {"apiBaseUrl": base_url, "posts": posts, "categories": categories}
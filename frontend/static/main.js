@@ -3,6 +3,8 @@
    ========================================================================== */
 let categories = [];
 let postToEditId = null;
+let liveStream = null;
+let reloadTimer = null;
 
 
 /* ==========================================================================
@@ -14,13 +16,30 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('api-base-url').value = savedBaseUrl;
     }
 
-    loadCategories();
-    loadPosts();
+    // 🖨️ Server-rendered page: start from the embedded data instead of two API calls
+    const bootstrap = readBootstrap();
+    if (bootstrap) {
+        showCategories(bootstrap.categories);
+        showPosts(bootstrap.posts, bootstrap.apiBaseUrl);
+    } else {
+        loadCategories();
+        loadPosts();
+    }
+    connectLiveStream();
     updateAuthButton();
     updateUserInfo();
 });
 
 
+function readBootstrap() {
+    const element = document.getElementById('bootstrap');
+    if (!element) return null;
+    const bootstrap = JSON.parse(element.textContent);
+    // 👇 Only valid for the API the page is pointed at (the select may be restored to another)
+    return bootstrap.apiBaseUrl === document.getElementById('api-base-url').value ? bootstrap : null;
+}
+
+
 /* ==========================================================================
    BASE URL & SEARCH INPUT
    ========================================================================== */
@@ -28,6 +47,7 @@ function storeBaseUrl() {
     const url = document.getElementById("api-base-url").value;
     localStorage.setItem("apiBaseUrl", url);
     loadPosts();
+    connectLiveStream();
 }
 
 document.getElementById('search-input').addEventListener('keydown', function (event) {
@@ -55,149 +75,157 @@ function loadPosts() {
 
     fetch(baseUrl + '/posts?' + params.toString())
         .then(response => response.json())
-        .then(data => {
-            const postContainer = document.getElementById('post-container');
-            postContainer.innerHTML = '';
-
-            const posts = data.posts || data;
-
-            posts.forEach(post => {
-                const postDiv = document.createElement('div');
-                postDiv.className = 'post';
+        .then(data => showPosts(data, baseUrl))
+        .catch(error => console.error('Error loading posts:', error));
+}
 
-                const title = document.createElement('h2');
-                title.textContent = post.title;
+function showPosts(data, baseUrl) {
+    const postContainer = document.getElementById('post-container');
+    postContainer.innerHTML = '';
 
-                const content = document.createElement('p');
-                content.textContent = post.content;
+    const posts = data.posts || data;
 
-                const meta = document.createElement('p');
-                meta.className = 'post-meta';
-                meta.textContent = `${post.date || 'No date'} · by ${post.author || 'Unknown'}`;
+    posts.forEach(post => {
+        const postDiv = document.createElement('div');
+        postDiv.className = 'post';
 
-                const updated = document.createElement('p');
-                if (post.updated) {
-                    updated.textContent = `Updated: ${post.updated}`;
-                    updated.style.fontSize = '0.9em';
-                    updated.style.color = '#777';
-                    updated.style.marginBottom = '10px';
-                }
+        const title = document.createElement('h2');
+        title.textContent = post.title;
 
-                const likeButton = document.createElement('button');
-                likeButton.innerHTML = `❤️ <span id="like-count-${post.id}">${post.likes || 0}</span>`;
-                likeButton.onclick = () => likePost(post.id);
+        const content = document.createElement('p');
+        content.textContent = post.content;
 
-                const deleteButton = document.createElement('button');
-                deleteButton.textContent = '🗑️ Delete';
-                deleteButton.onclick = () => deletePost(post.id);
+        const meta = document.createElement('p');
+        meta.className = 'post-meta';
+        meta.textContent = `${post.date || 'No date'} · by ${post.author || 'Unknown'}`;
 
-                const editButton = document.createElement('button');
-                editButton.textContent = '✏️ Edit';
-                editButton.onclick = () => openEditModal(post);
+        const updated = document.createElement('p');
+        if (post.updated) {
+            updated.textContent = `Updated: ${post.updated}`;
+            updated.style.fontSize = '0.9em';
+            updated.style.color = '#777';
+            updated.style.marginBottom = '10px';
+        }
 
-                const buttonWrapper = document.createElement('div');
-                buttonWrapper.style.display = 'flex';
-                buttonWrapper.style.justifyContent = 'space-between';
-                buttonWrapper.style.gap = '10px';
-                buttonWrapper.style.marginTop = '10px';
-                buttonWrapper.appendChild(likeButton);
+        const likeButton = document.createElement('button');
+        likeButton.innerHTML = `❤️ <span id="like-count-${post.id}">${post.likes || 0}</span>`;
+        likeButton.onclick = () => likePost(post.id);
+
+        const deleteButton = document.createElement('button');
+        deleteButton.textContent = '🗑️ Delete';
+        deleteButton.onclick = () => deletePost(post.id);
+
+        const editButton = document.createElement('button');
+        editButton.textContent = '✏️ Edit';
+        editButton.onclick = () => openEditModal(post);
+
+        const buttonWrapper = document.createElement('div');
+        buttonWrapper.style.display = 'flex';
+        buttonWrapper.style.justifyContent = 'space-between';
+        buttonWrapper.style.gap = '10px';
+        buttonWrapper.style.marginTop = '10px';
+        buttonWrapper.appendChild(likeButton);
+
+        const currentUser = localStorage.getItem("username");
+        if (post.author === currentUser) {
+            buttonWrapper.appendChild(editButton);
+            buttonWrapper.appendChild(deleteButton);
+        }
 
-                const currentUser = localStorage.getItem("username");
-                if (post.author === currentUser) {
-                    buttonWrapper.appendChild(editButton);
-                    buttonWrapper.appendChild(deleteButton);
-                }
+        postDiv.style.padding = '15px';
+        postDiv.style.border = '1px solid #ccc';
+        postDiv.style.marginBottom = '20px';
+        postDiv.style.borderRadius = '8px';
+
+        postDiv.appendChild(title);
+        postDiv.appendChild(content);
+        postDiv.appendChild(meta);
+        if (post.updated) postDiv.appendChild(updated);
+        postDiv.appendChild(buttonWrapper);
+
+        // 🗨️ Comment Section
+        // 🗨️ Comments Section Container
+        const commentsContainer = document.createElement('div');
+        commentsContainer.className = 'comments-section';
+
+        // 🔘 Toggle Button
+        const toggleButton = document.createElement('button');
+        toggleButton.textContent = "Comments";
+        toggleButton.className = 'toggle-comments';
+
+        const commentBlock = document.createElement('div');
+        commentBlock.className = 'comment-block';
+        commentBlock.style.display = 'none';  // hidden by default
+
+        toggleButton.onclick = () => {
+            commentBlock.style.display = commentBlock.style.display === 'none' ? 'block' : 'none';
+        };
+
+        // 💬 Existing Comments
+        const commentList = document.createElement('div');
+        commentList.className = 'comment-list';
+        commentList.id = `comment-list-${post.id}`;
+
+        if (post.comments && post.comments.length > 0) {
+            post.comments.forEach(comment => appendComment(commentList, comment));
+        } else {
+            commentList.innerHTML = "<em>No comments yet.</em>";
+        }
 
-                postDiv.style.padding = '15px';
-                postDiv.style.border = '1px solid #ccc';
-                postDiv.style.marginBottom = '20px';
-                postDiv.style.borderRadius = '8px';
+        // ✍️ Comment Form
+        const commentInput = document.createElement('textarea');
+        commentInput.placeholder = "Write a comment...";
+        commentInput.className = 'comment-input';
+
+        const commentBtn = document.createElement('button');
+        commentBtn.textContent = "Submit";
+        commentBtn.className = 'comment-submit';
+
+        commentBtn.onclick = () => {
+            const text = commentInput.value.trim();
+            if (!text) return alert("Comment can't be empty!");
+
+            fetch(`${baseUrl}/posts/${post.id}/comments`, {
+                method: "POST",
+                headers: {
+                    "Content-Type": "application/json"
+                },
+                body: JSON.stringify({
+                    author: localStorage.getItem("username") || "Anonymous",
+                    text: text
+                })
+            })
+            .then(res => res.json())
+            .then(data => {
+                console.log("✅ Comment added:", data);
+                commentInput.value = '';
+                refreshAfterChange();  // the live stream appends the comment, else reload
+            })
+            .catch(err => {
+                console.error("❌ Comment error:", err);
+                alert("Failed to add comment.");
+            });
+        };
 
-                postDiv.appendChild(title);
-                postDiv.appendChild(content);
-                postDiv.appendChild(meta);
-                if (post.updated) postDiv.appendChild(updated);
-                postDiv.appendChild(buttonWrapper);
+        // 🧩 Assemble comments block
+        commentBlock.appendChild(commentList);
+        commentBlock.appendChild(commentInput);
+        commentBlock.appendChild(commentBtn);
 
-                // 🗨️ Comment Section
-                // 🗨️ Comments Section Container
-                const commentsContainer = document.createElement('div');
-                commentsContainer.className = 'comments-section';
-
-                // 🔘 Toggle Button
-                const toggleButton = document.createElement('button');
-                toggleButton.textContent = "Comments";
-                toggleButton.className = 'toggle-comments';
-
-                const commentBlock = document.createElement('div');
-                commentBlock.className = 'comment-block';
-                commentBlock.style.display = 'none';  // hidden by default
-
-                toggleButton.onclick = () => {
-                    commentBlock.style.display = commentBlock.style.display === 'none' ? 'block' : 'none';
-                };
-
-                // 💬 Existing Comments
-                const commentList = document.createElement('div');
-                commentList.className = 'comment-list';
-
-                if (post.comments && post.comments.length > 0) {
-                    post.comments.forEach(comment => {
-                        const c = document.createElement('p');
-                        c.innerHTML = `<strong>${comment.author}</strong>: ${comment.text}`;
-                        commentList.appendChild(c);
-                    });
-                } else {
-                    commentList.innerHTML = "<em>No comments yet.</em>";
-                }
+        commentsContainer.appendChild(toggleButton);
+        commentsContainer.appendChild(commentBlock);
+        postDiv.appendChild(commentsContainer);
 
-                // ✍️ Comment Form
-                const commentInput = document.createElement('textarea');
-                commentInput.placeholder = "Write a comment...";
-                commentInput.className = 'comment-input';
-
-                const commentBtn = document.createElement('button');
-                commentBtn.textContent = "Submit";
-                commentBtn.className = 'comment-submit';
-
-                commentBtn.onclick = () => {
-                    const text = commentInput.value.trim();
-                    if (!text) return alert("Comment can't be empty!");
-
-                    fetch(`${baseUrl}/posts/${post.id}/comments`, {
-                        method: "POST",
-                        headers: {
-                            "Content-Type": "application/json"
-                        },
-                        body: JSON.stringify({
-                            author: localStorage.getItem("username") || "Anonymous",
-                            text: text
-                        })
-                    })
-                    .then(res => res.json())
-                    .then(data => {
-                        console.log("✅ Comment added:", data);
-                        loadPosts();  // reloads with new comment
-                    })
-                    .catch(err => {
-                        console.error("❌ Comment error:", err);
-                        alert("Failed to add comment.");
-                    });
-                };
-
-                // 🧩 Assemble comments block
-                commentBlock.appendChild(commentList);
-                commentBlock.appendChild(commentInput);
-                commentBlock.appendChild(commentBtn);
-
-                commentsContainer.appendChild(toggleButton);
-                commentsContainer.appendChild(commentBlock);
-                postDiv.appendChild(commentsContainer);
+        postContainer.appendChild(postDiv);
+    });
+}
 
-                postContainer.appendChild(postDiv);
-            });
-        })
-        .catch(error => console.error('Error loading posts:', error));
+function appendComment(commentList, comment) {
+    const placeholder = commentList.querySelector('em');
+    if (placeholder) placeholder.remove();
+    const c = document.createElement('p');
+    c.innerHTML = `<strong>${comment.author}</strong>: ${comment.text}`;
+    commentList.appendChild(c);
 }
 
 function renderPost(post) {
@@ -358,7 +386,7 @@ function addPost() {
     .then(response => response.json())
     .then(data => {
         console.log('✅ Post added:', data);
-        loadPosts();
+        refreshAfterChange();
     })
     .catch(error => {
         console.error('❌ Failed to add post:', error);
@@ -388,7 +416,7 @@ function deletePost(postId) {
     })
     .then(data => {
         console.log("✅ Deleted:", data);
-        loadPosts();
+        refreshAfterChange();
     })
     .catch(error => {
         console.error("❌ Delete failed:", error.message);
@@ -397,6 +425,46 @@ function deletePost(postId) {
 }
 
 
+/* ==========================================================================
+   LIVE UPDATES (server-sent events from api/v2/stream)
+   ========================================================================== */
+function connectLiveStream() {
+    const baseUrl = document.getElementById('api-base-url').value;
+    if (liveStream) liveStream.close();
+    liveStream = null;
+    if (!baseUrl.endsWith('/v2') || !window.EventSource) return;
+
+    liveStream = new EventSource(baseUrl + '/stream');
+    liveStream.onerror = () => {
+        // 👇 A WSGI backend answers 501: no live updates, refreshAfterChange() re-fetches instead
+        if (liveStream && liveStream.readyState === EventSource.CLOSED) liveStream = null;
+    };
+    liveStream.addEventListener('post.liked', event => {
+        const data = JSON.parse(event.data);
+        const count = document.getElementById(`like-count-${data.id}`);
+        if (count) count.textContent = data.likes;
+    });
+    liveStream.addEventListener('comment.added', event => {
+        const data = JSON.parse(event.data);
+        const list = document.getElementById(`comment-list-${data.post_id}`);
+        if (list) appendComment(list, data.comment);
+    });
+    ['post.created', 'post.updated', 'post.deleted', 'resync'].forEach(type => {
+        liveStream.addEventListener(type, scheduleReload);
+    });
+}
+
+function scheduleReload() {
+    clearTimeout(reloadTimer);
+    reloadTimer = setTimeout(loadPosts, 300);  // one reload for a burst of changes
+}
+
+function refreshAfterChange() {
+    // 👇 With a live stream the change event updates the page, no need to re-fetch everything
+    if (!liveStream || liveStream.readyState !== EventSource.OPEN) loadPosts();
+}
+
+
 /* ==========================================================================
    POSTS: LIKE
    ========================================================================== */
@@ -432,45 +500,49 @@ function loadCategories() {
         .then(response => response.json())
         .then(fetchedCategories => {
             console.log("✅ Categories received:", fetchedCategories);
-            categories = fetchedCategories; // update global list
-
-            // Get dropdowns
-            const filterSelect = document.getElementById('filter-category');
-            const addSelect = document.getElementById('add-category');
-            const editSelect = document.getElementById('edit-category');
-
-            // 🧼 Clear & repopulate Filter dropdown
-            if (filterSelect) {
-                filterSelect.innerHTML = '<option value="">All Categories</option>';
-                categories.forEach(cat => {
-                    const opt = new Option(cat, cat);
-                    filterSelect.appendChild(opt);
-                });
-            }
-
-            // 🧼 Clear & repopulate Add dropdown
-            if (addSelect) {
-                addSelect.innerHTML = '<option value="">Select Category</option>';
-                categories.forEach(cat => {
-                    const opt = new Option(cat, cat);
-                    addSelect.appendChild(opt);
-                });
-            }
-
-            // 🧼 Clear & repopulate Edit dropdown (leave selection logic to `openEditModal`)
-            if (editSelect) {
-                editSelect.innerHTML = '<option value="">Select Category</option>';
-                categories.forEach(cat => {
-                    const opt = new Option(cat, cat);
-                    editSelect.appendChild(opt);
-                });
-            }
+            showCategories(fetchedCategories);
         })
         .catch(error => {
             console.error("❌ Failed to load categories:", error);
         });
 }
 
+function showCategories(fetchedCategories) {
+    categories = fetchedCategories; // update global list
+
+    // Get dropdowns
+    const filterSelect = document.getElementById('filter-category');
+    const addSelect = document.getElementById('add-category');
+    const editSelect = document.getElementById('edit-category');
+
+    // 🧼 Clear & repopulate Filter dropdown
+    if (filterSelect) {
+        filterSelect.innerHTML = '<option value="">All Categories</option>';
+        categories.forEach(cat => {
+            const opt = new Option(cat, cat);
+            filterSelect.appendChild(opt);
+        });
+    }
+
+    // 🧼 Clear & repopulate Add dropdown
+    if (addSelect) {
+        addSelect.innerHTML = '<option value="">Select Category</option>';
+        categories.forEach(cat => {
+            const opt = new Option(cat, cat);
+            addSelect.appendChild(opt);
+        });
+    }
+
+    // 🧼 Clear & repopulate Edit dropdown (leave selection logic to `openEditModal`)
+    if (editSelect) {
+        editSelect.innerHTML = '<option value="">Select Category</option>';
+        categories.forEach(cat => {
+            const opt = new Option(cat, cat);
+            editSelect.appendChild(opt);
+        });
+    }
+}
+
 /* ==========================================================================
    AUTHENTICATION: LOGIN / LOGOUT / REGISTER / MODALS
    ========================================================================== */
@@ -668,7 +740,7 @@ function submitAdd() {
     })
     .then(data => {
         closeModal();
-        loadPosts();
+        refreshAfterChange();
     })
     .catch(err => {
         console.error("❌ Failed to add post:", err.message);
@@ -731,7 +803,7 @@ function submitUpdate() {
     })
     .then(data => {
         closeModal();
-        loadPosts();
+        refreshAfterChange();
     })
     .catch(err => {
         console.error("❌ Failed to update post:", err.message);